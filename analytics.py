@@ -0,0 +1,198 @@
+from datetime import date
+from enum import Enum
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from columnar import connect_duckdb
+from database import get_db
+from models import AttendanceMonthlyRollup as AttendanceMonthlyRollupModel, SchoolDailyRollup as SchoolDailyRollupModel
+from schemas import AttendanceMonthlyRollup, SchoolDailyRollup
+
+router = APIRouter(prefix="/analytics")
+
+
+class AttendanceGrouping(str, Enum):
+    school = "school"
+    socio_economic_status = "socio_economic_status"
+    month = "month"
+
+
+class IncidentGrouping(str, Enum):
+    incident_type = "incident_type"
+    school = "school"
+    month = "month"
+
+
+def school_join(student_id: str, on_date: str) -> str:
+    # Students belong to a school through the enrolment that was open on that date
+    return f"""
+        JOIN school.enrolments e ON e.student_id = {student_id}
+            AND {on_date} >= CAST(e.start_date AS DATE)
+            AND (e.end_date IS NULL OR {on_date} <= CAST(e.end_date AS DATE))
+        JOIN school.schools s ON s.id = e.school_id"""
+
+
+def grouping_sql(grouping: str, student_id: str, on_date: str):
+    """Return ``(select columns, group by columns, join)`` for one grouping"""
+    if grouping == "school":
+        return ["s.id AS school_id", "s.name AS school_name"], ["s.id", "s.name"], school_join(student_id, on_date)
+    if grouping == "socio_economic_status":
+        return (["st.socio_economic_status"], ["st.socio_economic_status"],
+                f"\n        JOIN school.students st ON st.id = {student_id}")
+    if grouping == "month":
+        return [f"strftime({on_date}, '%Y-%m') AS month"], [f"strftime({on_date}, '%Y-%m')"], ""
+    return [f"f.{grouping}"], [f"f.{grouping}"], ""
+
+
+def grouped_query(fact: str, measures: List[str], groupings: list, date_from: Optional[date], date_to: Optional[date]):
+    """Aggregate ``fact`` (a subquery aliased f with student_id and day columns) over ``groupings``"""
+    select, group_by, joins = [], [], []
+    for grouping in dict.fromkeys(g.value for g in groupings):
+        columns, keys, join = grouping_sql(grouping, "f.student_id", "f.day")
+        select += columns
+        group_by += keys
+        joins.append(join)
+    sql = f"SELECT {', '.join(select + measures)} FROM ({fact}) f{''.join(joins)}"
+    where, params = [], []
+    if date_from:
+        where.append("f.day >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("f.day <= ?")
+        params.append(date_to)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if group_by:
+        sql += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+    return sql, params
+
+
+def run_query(sql: str, params: list) -> dict:
+    con = connect_duckdb()
+    try:
+        cursor = con.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return {"rows": [dict(zip(columns, row)) for row in cursor.fetchall()]}
+    finally:
+        con.close()
+
+
+@router.get("/attendance-rate")
+def attendance_rate(
+    group_by: List[AttendanceGrouping] = Query([AttendanceGrouping.school], description="Group by school, socio_economic_status and/or month (repeat the parameter to combine)"),
+    date_from: Optional[date] = Query(None, description="Only attendances on or after this date"),
+    date_to: Optional[date] = Query(None, description="Only attendances on or before this date"),
+):
+    """Share of attendances marked present, aggregated by DuckDB over the SQLite file"""
+    fact = ("SELECT student_id, CAST(attendance_date AS DATE) AS day, CAST(present AS INTEGER) AS present "
+            "FROM school.attendances")
+    measures = ["count(*) AS attendances", "sum(f.present) AS present",
+                "round(avg(f.present), 4) AS attendance_rate"]
+    return run_query(*grouped_query(fact, measures, group_by, date_from, date_to))
+
+
+@router.get("/incidents")
+def incident_counts(
+    group_by: List[IncidentGrouping] = Query([IncidentGrouping.incident_type], description="Group by incident_type, school and/or month (repeat the parameter to combine)"),
+    date_from: Optional[date] = Query(None, description="Only incidents reported on or after this date"),
+    date_to: Optional[date] = Query(None, description="Only incidents reported on or before this date"),
+):
+    """Number of incidents, aggregated by DuckDB over the SQLite file"""
+    fact = ("SELECT student_id, incident_type, CAST(reported_datetime AS DATE) AS day "
+            "FROM school.incidents")
+    measures = ["count(*) AS incidents", "count(DISTINCT f.student_id) AS students"]
+    return run_query(*grouped_query(fact, measures, group_by, date_from, date_to))
+
+
+@router.get("/enrolments-per-year")
+def enrolments_per_year(school_id: Optional[int] = Query(None, description="Only this school")):
+    """How many students were enrolled each year at each school"""
+    sql = """
+        SELECT s.id AS school_id, s.name AS school_name,
+               year(CAST(e.start_date AS DATE)) AS enrolment_year,
+               count(DISTINCT e.student_id) AS students
+        FROM school.enrolments e
+        JOIN school.schools s ON s.id = e.school_id"""
+    params = []
+    if school_id is not None:
+        sql += " WHERE s.id = ?"
+        params.append(school_id)
+    sql += " GROUP BY s.id, s.name, enrolment_year ORDER BY s.name, enrolment_year"
+    return run_query(sql, params)
+
+
+@router.get("/student-timeline")
+def student_timeline(
+    student_id: Optional[int] = Query(None, description="Only this student"),
+    school_id: Optional[int] = Query(None, description="Only this school"),
+    limit: int = Query(1000, description="Maximum number of rows to return"),
+):
+    """A row per student, school and class for each scholastic year, ordered by student then calendar year"""
+    sql = """
+        SELECT st.id AS student_id, st.first_name, st.last_name,
+               sch.id AS school_id, sch.name AS school_name,
+               sy.year AS scholastic_year, cls.name AS class_name, ce.calendar_year,
+               CAST(en.start_date AS DATE) AS enrolment_start_date,
+               CAST(en.end_date AS DATE) AS enrolment_end_date
+        FROM school.students st
+        JOIN school.enrolments en ON st.id = en.student_id
+        JOIN school.schools sch ON en.school_id = sch.id
+        JOIN school.class_enrolments ce ON en.id = ce.enrolment_id
+        JOIN school.classes cls ON ce.class_id = cls.id
+        JOIN school.scholastic_year sy ON cls.scholastic_year_id = sy.id"""
+    where, params = [], []
+    if student_id is not None:
+        where.append("st.id = ?")
+        params.append(student_id)
+    if school_id is not None:
+        where.append("sch.id = ?")
+        params.append(school_id)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY st.id, ce.calendar_year, cls.name LIMIT ?"
+    params.append(limit)
+    return run_query(sql, params)
+
+
+@router.get("/attendance-monthly", response_model=List[AttendanceMonthlyRollup])
+def attendance_monthly(
+    db: Session = Depends(get_db),
+    student_id: Optional[int] = Query(None, description="Only this student"),
+    class_id: Optional[int] = Query(None, description="Only this class"),
+    month_from: Optional[str] = Query(None, description="First month to include (YYYY-MM)"),
+    month_to: Optional[str] = Query(None, description="Last month to include (YYYY-MM)"),
+    limit: int = Query(1000, description="Maximum number of rows to return"),
+):
+    """Attendance per student, class and month, read from the incrementally maintained rollup table"""
+    query = db.query(AttendanceMonthlyRollupModel)
+    if student_id is not None:
+        query = query.filter(AttendanceMonthlyRollupModel.student_id == student_id)
+    if class_id is not None:
+        query = query.filter(AttendanceMonthlyRollupModel.class_id == class_id)
+    if month_from:
+        query = query.filter(AttendanceMonthlyRollupModel.month >= month_from)
+    if month_to:
+        query = query.filter(AttendanceMonthlyRollupModel.month <= month_to)
+    return query.order_by(AttendanceMonthlyRollupModel.student_id, AttendanceMonthlyRollupModel.class_id,
+                          AttendanceMonthlyRollupModel.month).limit(limit).all()
+
+
+@router.get("/school-daily", response_model=List[SchoolDailyRollup])
+def school_daily(
+    db: Session = Depends(get_db),
+    school_id: Optional[int] = Query(None, description="Only this school"),
+    day_from: Optional[date] = Query(None, description="First day to include"),
+    day_to: Optional[date] = Query(None, description="Last day to include"),
+    limit: int = Query(1000, description="Maximum number of rows to return"),
+):
+    """Attendances and incidents per school and day, read from the incrementally maintained rollup table"""
+    query = db.query(SchoolDailyRollupModel)
+    if school_id is not None:
+        query = query.filter(SchoolDailyRollupModel.school_id == school_id)
+    if day_from:
+        query = query.filter(SchoolDailyRollupModel.day >= day_from)
+    if day_to:
+        query = query.filter(SchoolDailyRollupModel.day <= day_to)
+    return query.order_by(SchoolDailyRollupModel.school_id, SchoolDailyRollupModel.day).limit(limit).all()
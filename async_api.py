@@ -0,0 +1,97 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import config
+from counts import TotalMode, row_counts
+from database import build_async_engine
+from entities import ENTITIES, Entity
+from expansion import EXPAND_DESCRIPTION, dump_expanded, expand_options, parse_expand
+from filters import filter_clauses, filter_dependency
+from pagination import page_query, page_result
+from projection import FIELDS_DESCRIPTION, all_fields, parse_fields, projected_columns
+from schemas import PaginatedResponse
+from serializers import dump_rows, json_response
+
+async_engine = build_async_engine(config.DATABASE_URL, config.DB_PROFILE)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine)
+
+router = APIRouter()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def count_total_async(db: AsyncSession, statement, model, mode: TotalMode):
+    """Async counterpart of counts.count_total"""
+    if mode == TotalMode.false:
+        return None
+    if mode == TotalMode.estimate:
+        count = row_counts.cached(model)
+        if count is None:
+            count = row_counts.seed(model, await db.scalar(select(func.count(model.id))))
+        return count
+    return await db.scalar(select(func.count()).select_from(statement.order_by(None).subquery()))
+
+
+def add_entity_routes(entity: Entity):
+    model, schema = entity.model, entity.schema
+
+    async def read_items(
+        request: Request,
+        db: AsyncSession = Depends(get_async_db),
+        page: Optional[int] = Query(None, ge=1, description="Page number, starting at 1 (only use one of page or offset)"),
+        limit: int = Query(10, ge=1, description=f"Number of {entity.path} to retrieve"),
+        offset: Optional[int] = Query(None, ge=0, description=f"Number of {entity.path} to skip (only use one of page or offset)"),
+        cursor: Optional[str] = Query(None, description="Cursor from the previous page's next link (used by default when page and offset are not given)"),
+        sort: Optional[str] = Query(None, description="Field to sort by"),
+        order: Optional[str] = Query(None, description="Sort order (asc or desc)"),
+        include_total: TotalMode = Query(TotalMode.exact, description="How to compute total: false skips it, exact counts the filtered rows, estimate uses the cached table row count"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+        filters: dict = Depends(filter_dependency(entity)),
+    ):
+        names, expanded = parse_fields(entity, fields), parse_expand(entity, expand)
+        if names and expanded:
+            raise HTTPException(status_code=400, detail="fields and expand can't be combined")
+        names = names or all_fields(entity)
+        statement = select(model).options(*expand_options(entity, expanded)) if expanded else select(*projected_columns(entity, names, sort))
+        statement = statement.where(*filter_clauses(entity, filters))
+        total = await count_total_async(db, statement, model, include_total)
+        paging = dict(limit=limit, offset=offset, page=page, sort=sort, order=order)
+        result = await db.execute(page_query(statement, model, cursor=cursor, **paging))
+        rows = result.scalars().all() if expanded else result.all()
+        items, next_url = page_result(request, rows, model, **paging)
+        if expanded:
+            return json_response({"items": dump_expanded(entity, expanded, items), "total": total, "next": next_url})
+        return json_response({"items": dump_rows(entity, names, items), "total": total, "next": next_url})
+
+    async def get_item(item_id: int, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+                       expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+                       db: AsyncSession = Depends(get_async_db)):
+        names, expanded = parse_fields(entity, fields), parse_expand(entity, expand)
+        if names and expanded:
+            raise HTTPException(status_code=400, detail="fields and expand can't be combined")
+        if expanded:
+            row = await db.get(model, item_id, options=expand_options(entity, expanded))
+        else:
+            names = names or all_fields(entity)
+            row = (await db.execute(select(*projected_columns(entity, names)).where(model.id == item_id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail=f"{entity.label} not found")
+        if expanded:
+            return json_response(dump_expanded(entity, expanded, [row])[0])
+        return json_response(dump_rows(entity, names, [row])[0])
+
+    router.add_api_route(f"/{entity.path}/", read_items, methods=["GET"],
+                         response_model=PaginatedResponse[schema], name=f"read_{entity.path}_async")
+    router.add_api_route(f"/{entity.path}/{{item_id}}", get_item, methods=["GET"],
+                         response_model=schema, name=f"get_{entity.path}_by_id_async")
+
+
+for entity in ENTITIES.values():
+    add_entity_routes(entity)
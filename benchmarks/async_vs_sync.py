@@ -0,0 +1,106 @@
+"""Throughput of the read routes at high concurrency, sync mode against async mode
+
+Each mode runs in its own process, since SCHOOL_API_MODE is read when main is
+imported, against the same generated database. Requests are driven in-process
+through httpx's ASGI transport, so the numbers measure the app and not the
+network stack.
+
+    uv run --extra async python -m benchmarks.async_vs_sync --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ["sync", "async"]
+
+
+def read_paths(count: int, students: int) -> list:
+    rng = random.Random(0)
+    templates = [
+        lambda: "/students/?limit=50",
+        lambda: "/attendances/?limit=50&sort=attendance_date&include_total=estimate",
+        lambda: f"/students/{rng.randint(1, students)}",
+        lambda: f"/attendances/{rng.randint(1, students * 10)}",
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+
+async def drive(app, paths: list, concurrency: int) -> dict:
+    import httpx
+
+    latencies = []
+    next_request = itertools.count()
+
+    async def worker(client):
+        while (i := next(next_request)) < len(paths):
+            started = time.perf_counter()
+            response = await client.get(paths[i])
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {"requests_per_second": len(paths) / elapsed, "p50_ms": quantiles[49], "p95_ms": quantiles[94], "p99_ms": quantiles[98]}
+
+
+def run_mode(args):
+    import main
+
+    # ASGITransport doesn't send lifespan events, so run the startup hook directly
+    main.startup_event()
+    result = asyncio.run(drive(main.app, read_paths(args.requests, args.students), args.concurrency))
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        return run_mode(args)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   SCHOOL_DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                   SCHOOL_SNAPSHOT_DIR=os.path.join(directory, "snapshots"),
+                   SCHOOL_STUDENTS=str(args.students), SCHOOL_SEED="0",
+                   # Measure the handlers, not the response cache
+                   SCHOOL_CACHE_SIZE="0")
+        for mode in MODES:
+            # The first run generates the database, the second reuses it
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.async_vs_sync", "--mode", mode, "--students", str(args.students),
+                 "--concurrency", str(args.concurrency), "--requests", str(args.requests)],
+                env=dict(env, SCHOOL_API_MODE=mode), check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'mode':6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode, result in results.items():
+        print(f"{mode:6} {result['requests_per_second']:9.0f} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"students": args.students, "concurrency": args.concurrency, "requests": args.requests,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Incremental-sync query latency before and after the indexes declared in models.py
+
+Generates a dataset, touches a small fraction of rows so ``updated_after``
+selects a realistic delta, then times the sync queries with every secondary
+index dropped and again after ``ensure_indexes`` (the migration path used for
+existing databases).
+
+    uv run python -m benchmarks.incremental_sync --students 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import Session
+
+from data_generation import Scale, populate_data
+from database import ensure_indexes
+from models import Base, Attendance as AttendanceModel, ClassEnrolment as ClassEnrolmentModel, Enrolment as EnrolmentModel, Incident as IncidentModel, Student as StudentModel
+
+
+def sync_queries(cutoff: datetime):
+    return {
+        "attendances page updated_after": select(AttendanceModel).where(AttendanceModel.updated_at > cutoff)
+            .order_by(AttendanceModel.updated_at, AttendanceModel.id).limit(100),
+        "attendances count updated_after": select(func.count()).select_from(AttendanceModel)
+            .where(AttendanceModel.updated_at > cutoff),
+        "students page updated_after": select(StudentModel).where(StudentModel.updated_at > cutoff)
+            .order_by(StudentModel.updated_at, StudentModel.id).limit(100),
+        "attendances of one student": select(AttendanceModel).where(AttendanceModel.student_id == 42),
+        "class enrolments of one enrolment": select(ClassEnrolmentModel).where(ClassEnrolmentModel.enrolment_id == 42),
+        "incidents of one student": select(IncidentModel).where(IncidentModel.student_id == 42),
+        "enrolments per school": select(EnrolmentModel.school_id, func.count()).group_by(EnrolmentModel.school_id),
+    }
+
+
+def time_queries(engine, queries: dict, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as connection:
+        for name, statement in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(statement).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--changed-fraction", type=float, default=0.01, help="Fraction of rows updated after the sync cutoff")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            populate_data(db, Scale(students=args.students), seed=0)
+
+        # Everything was generated "now"; push it into the past and bring a fraction of rows back as the delta
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=1)
+        every = max(1, round(1 / args.changed_fraction))
+        with engine.begin() as connection:
+            for model in (AttendanceModel, StudentModel):
+                connection.execute(update(model).values(updated_at=cutoff - timedelta(days=1)))
+                connection.execute(update(model).where(model.id % every == 0).values(updated_at=datetime.now(timezone.utc)))
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.drop(connection)
+
+        queries = sync_queries(cutoff)
+        before = time_queries(engine, queries, args.repeat)
+        ensure_indexes(engine)
+        after = time_queries(engine, queries, args.repeat)
+        engine.dispose()
+
+    print(f"{'query':40} {'before ms':>10} {'after ms':>10} {'speed-up':>9}")
+    for name in queries:
+        print(f"{name:40} {before[name]:10.2f} {after[name]:10.2f} {before[name] / after[name]:8.1f}x")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"students": args.students, "changed_fraction": args.changed_fraction,
+                       "before_ms": before, "after_ms": after}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Replay a JSONL capture of API requests and report latency per endpoint and response mismatches
+
+Each line of the capture is one request::
+
+    {"timestamp": "2024-05-01T09:00:00.120Z", "method": "GET", "path": "/students/",
+     "params": {"limit": 10}, "body": null, "status": 200, "response": {...}}
+
+``timestamp`` (ISO 8601 or epoch seconds), ``params``, ``body``, ``status`` and
+``response`` are optional. Requests are sent at their recorded offsets divided
+by ``--speed`` (0 sends them back to back), with at most ``--concurrency`` in
+flight. By default the app is run in-process as configured by the SCHOOL_*
+environment variables; ``--base-url`` replays against a running server instead.
+
+When a line has a ``status`` or ``response`` the replayed one is compared with
+it, ignoring the ``--ignore-fields`` keys (timestamps and next links by default).
+
+    uv run python -m benchmarks.replay capture.jsonl --speed 10 --concurrency 50 --reset --output replay.json
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# Upper bounds (ms) of the latency histogram buckets, the last bucket is everything slower
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+# Numeric path segments, so /students/42 and /students/7 are reported as one endpoint
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+# Mismatches kept in full for the report
+MAX_MISMATCH_EXAMPLES = 20
+
+
+def parse_timestamp(value) -> float:
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def load_capture(path: str) -> list:
+    """Read the capture, ordered by timestamp with offsets in seconds from the first request"""
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    for entry in entries:
+        entry["_at"] = parse_timestamp(entry.get("timestamp"))
+    entries.sort(key=lambda entry: entry["_at"])
+    start = entries[0]["_at"] if entries else 0.0
+    for entry in entries:
+        entry["_at"] -= start
+    return entries
+
+
+def endpoint_of(method: str, path: str) -> str:
+    return f"{method.upper()} {ID_SEGMENT.sub('/{id}', path)}"
+
+
+def strip_fields(value, ignored: set):
+    if isinstance(value, dict):
+        return {key: strip_fields(item, ignored) for key, item in value.items() if key not in ignored}
+    if isinstance(value, list):
+        return [strip_fields(item, ignored) for item in value]
+    return value
+
+
+def compare(entry: dict, status: int, body, ignored: set):
+    """Return a description of how the replayed response differs from the recorded one, or None"""
+    if "status" in entry and entry["status"] != status:
+        return f"status {status}, recorded {entry['status']}"
+    if "response" in entry and strip_fields(entry["response"], ignored) != strip_fields(body, ignored):
+        return "response body differs"
+    return None
+
+
+def histogram(latencies: list) -> dict:
+    counts = {f"<={bound}ms": 0 for bound in HISTOGRAM_BUCKETS_MS}
+    counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] = 0
+    for latency in latencies:
+        bound = next((bound for bound in HISTOGRAM_BUCKETS_MS if latency <= bound), None)
+        counts[f"<={bound}ms" if bound is not None else f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+    return counts
+
+
+def endpoint_report(latencies: list, errors: int) -> dict:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {"requests": len(latencies), "errors": errors, "mean_ms": statistics.fmean(latencies),
+            "p50_ms": cuts[49], "p95_ms": cuts[94], "p99_ms": cuts[98], "histogram": histogram(latencies)}
+
+
+async def replay(client, entries: list, speed: float, concurrency: int, ignored: set) -> dict:
+    latencies, errors = defaultdict(list), defaultdict(int)
+    mismatches, mismatch_count, lag = [], 0, []
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def send(index: int, entry: dict):
+        nonlocal mismatch_count
+        async with semaphore:
+            # How far behind the recorded schedule this request went out (all concurrency slots busy)
+            lag.append(max(0.0, time.perf_counter() - started - (entry["_at"] / speed if speed else 0.0)) * 1000)
+            sent = time.perf_counter()
+            response = await client.request(entry.get("method", "GET"), entry["path"],
+                                            params=entry.get("params"), json=entry.get("body"))
+            elapsed = (time.perf_counter() - sent) * 1000
+        endpoint = endpoint_of(entry.get("method", "GET"), entry["path"])
+        latencies[endpoint].append(elapsed)
+        if response.status_code >= 400:
+            errors[endpoint] += 1
+        if "status" in entry or "response" in entry:
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            difference = compare(entry, response.status_code, body, ignored)
+            if difference:
+                mismatch_count += 1
+                if len(mismatches) < MAX_MISMATCH_EXAMPLES:
+                    mismatches.append({"line": index + 1, "endpoint": endpoint, "path": entry["path"],
+                                       "params": entry.get("params"), "difference": difference})
+
+    tasks = []
+    for index, entry in enumerate(entries):
+        if speed:
+            delay = entry["_at"] / speed - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(index, entry)))
+    await asyncio.gather(*tasks)
+    duration = time.perf_counter() - started
+
+    return {
+        "requests": len(entries), "duration_s": duration,
+        "throughput_rps": len(entries) / duration if duration else 0.0,
+        "max_lag_ms": max(lag, default=0.0),
+        "endpoints": {endpoint: endpoint_report(values, errors[endpoint]) for endpoint, values in sorted(latencies.items())},
+        "mismatches": mismatch_count, "mismatch_examples": mismatches,
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    entries = load_capture(args.capture)
+    ignored = set(args.ignore_fields)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+            if args.reset:
+                await client.post("/reset/")
+            return await replay(client, entries, args.speed, args.concurrency, ignored)
+
+    # Imported here so the SCHOOL_* environment is only read when replaying in-process
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            if args.reset:
+                await client.post("/reset/")
+            return await replay(client, entries, args.speed, args.concurrency, ignored)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="JSONL file of recorded requests")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression, e.g. 10 replays 10x faster (0: no delays)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum requests in flight")
+    parser.add_argument("--base-url", help="Replay against this running server instead of the app in-process")
+    parser.add_argument("--reset", action="store_true", help="POST /reset/ first so the data matches the recording")
+    parser.add_argument("--ignore-fields", nargs="*", default=["created_at", "updated_at", "next"],
+                        help="Keys left out when comparing responses")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(f"{report['requests']} requests in {report['duration_s']:.1f}s ({report['throughput_rps']:.1f} req/s), "
+          f"max {report['max_lag_ms']:.0f}ms behind schedule, {report['mismatches']} mismatches")
+    print(f"{'endpoint':40} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:40} {stats['requests']:7d} {stats['errors']:7d} "
+              f"{stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f}")
+        print("    " + "  ".join(f"{bucket} {count}" for bucket, count in stats["histogram"].items() if count))
+    for mismatch in report["mismatch_examples"]:
+        print(f"line {mismatch['line']}: {mismatch['endpoint']} {mismatch['difference']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
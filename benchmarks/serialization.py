@@ -0,0 +1,100 @@
+"""Per-row cost of serializing a page of attendances, Pydantic response_model path vs orjson Row path
+
+The Pydantic path is what list endpoints used to do: build
+``PaginatedResponse[Attendance]`` from ORM objects, then what FastAPI does with
+a response_model (dump, validate again, dump to JSON types, ``json.dumps``).
+The fast path selects the columns as Row tuples and encodes them with the
+per-entity serializer and orjson. Both are timed on the serialization alone
+and including the page query.
+
+    uv run python -m benchmarks.serialization --rows 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from data_generation import Scale, populate_data
+from entities import ENTITIES
+from models import Base
+from projection import all_fields, projected_columns
+from schemas import PaginatedResponse
+from serializers import dump_rows
+
+
+def pydantic_path(entity, items) -> bytes:
+    response_type = PaginatedResponse[entity.schema]
+    adapter = TypeAdapter(response_type)
+    response = response_type(items=items, total=len(items), next=None)
+    value = adapter.validate_python(response.model_dump())
+    return json.dumps(adapter.dump_python(value, mode="json")).encode()
+
+
+def orjson_path(entity, rows) -> bytes:
+    return orjson.dumps({"items": dump_rows(entity, all_fields(entity), rows), "total": len(rows), "next": None})
+
+
+def timed(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="Rows in the page")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    entity = ENTITIES["attendances"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            # About 10 attendances per student with the default scale
+            populate_data(db, Scale(students=max(100, args.rows // 10)), seed=0)
+
+        with Session(engine) as db:
+            orm_page = select(entity.model).order_by(entity.model.id).limit(args.rows)
+            row_page = select(*projected_columns(entity, all_fields(entity))).order_by(entity.model.id).limit(args.rows)
+            items, rows = db.scalars(orm_page).all(), db.execute(row_page).all()
+            assert json.loads(pydantic_path(entity, items)) == json.loads(orjson_path(entity, rows))
+
+        def query_and_serialize(path, run_query):
+            # A fresh session each time so the ORM path pays for building its objects
+            with Session(engine) as session:
+                return path(entity, run_query(session))
+
+        results = {
+            "pydantic serialize": timed(lambda: pydantic_path(entity, items), args.repeat),
+            "orjson serialize": timed(lambda: orjson_path(entity, rows), args.repeat),
+            "pydantic query + serialize": timed(
+                lambda: query_and_serialize(pydantic_path, lambda session: session.scalars(orm_page).all()), args.repeat),
+            "orjson query + serialize": timed(
+                lambda: query_and_serialize(orjson_path, lambda session: session.execute(row_page).all()), args.repeat),
+        }
+        engine.dispose()
+
+    per_row = {name: seconds * 1e6 / args.rows for name, seconds in results.items()}
+    print(f"{'path':28} {'page ms':>9} {'per row us':>11}")
+    for name, seconds in results.items():
+        print(f"{name:28} {seconds * 1000:9.2f} {per_row[name]:11.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "page_ms": {name: seconds * 1000 for name, seconds in results.items()},
+                       "per_row_us": per_row}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
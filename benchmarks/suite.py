@@ -0,0 +1,179 @@
+"""Latency and throughput of the API under list, paging, filter, get and write workloads
+
+Generates a dataset at the requested scale in a temporary directory, starts
+the app in-process (through its startup handler, so the data comes from
+data_generation exactly as on a real start) and drives it over httpx's ASGI
+transport with a fixed number of concurrent clients. Reports p50/p95/p99
+latency and throughput per entity and workload, and writes them as JSON so
+runs can be compared across commits.
+
+The response cache is disabled unless ``--cache`` is given, so repeated
+requests measure the handlers and the database.
+
+    uv run python -m benchmarks.suite --students 10000 --requests 500 --concurrency 20 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+
+WORKLOADS = ["list", "paging", "filter", "get", "create", "update"]
+
+
+def percentile(cuts: list, p: int) -> float:
+    return cuts[p - 1] if cuts else 0.0
+
+
+def summarize(entity: str, workload: str, latencies: list, errors: int, elapsed: float) -> dict:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "entity": entity, "workload": workload, "requests": len(latencies), "errors": errors,
+        "mean_ms": statistics.fmean(latencies), "p50_ms": percentile(cuts, 50), "p95_ms": percentile(cuts, 95),
+        "p99_ms": percentile(cuts, 99), "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+async def drive(client, make_request, requests: int, concurrency: int):
+    """Send ``requests`` requests from ``concurrency`` clients, returning ``(latencies ms, errors, elapsed s)``"""
+    latencies, errors = [], 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for n in queue:
+            method, url, body = make_request(n)
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def sample_rows(client, path: str, count: int = 200) -> list:
+    response = await client.get(f"/{path}/", params={"limit": count, "include_total": "false"})
+    return response.json()["items"]
+
+
+def workload_requests(entity, workload: str, rows: list, cursors: list, rng: random.Random):
+    """Return a function building the n-th ``(method, url, json body)`` of a workload"""
+    path = entity.path
+    create_fields = list(entity.create_schema.model_fields)
+    if workload == "list":
+        return lambda n: ("GET", f"/{path}/?limit=100&include_total=false", None)
+    if workload == "paging":
+        # Deep pages by cursor, cycling through the next links collected beforehand
+        return lambda n: ("GET", cursors[n % len(cursors)], None)
+    if workload == "filter":
+        column = next((name for name in entity.filters if name in rows[0]), None)
+        if column is None:
+            return lambda n: ("GET", f"/{path}/?ids={rng.choice(rows)['id']}&ids={rng.choice(rows)['id']}", None)
+        return lambda n: ("GET", f"/{path}/?{column}={rng.choice(rows)[column]}&limit=100", None)
+    if workload == "get":
+        return lambda n: ("GET", f"/{path}/{rng.choice(rows)['id']}", None)
+    if workload == "create":
+        return lambda n: ("POST", f"/{path}/", {name: rng.choice(rows)[name] for name in create_fields})
+    if workload == "update":
+        def update(n):
+            row = rng.choice(rows)
+            return "PUT", f"/{path}/{row['id']}", {name: row[name] for name in create_fields}
+        return update
+    raise ValueError(f"Unknown workload {workload}")
+
+
+async def collect_cursors(client, path: str, pages: int) -> list:
+    import httpx
+
+    cursors, url = [], f"/{path}/?limit=100&include_total=false"
+    for _ in range(pages):
+        response = (await client.get(url)).json()
+        if not response["next"]:
+            break
+        # The next links are absolute URLs on the transport's base URL, keep the path and query
+        url = httpx.URL(response["next"]).raw_path.decode()
+        cursors.append(url)
+    return cursors or [f"/{path}/?limit=100&include_total=false"]
+
+
+async def run_suite(args) -> list:
+    import httpx
+
+    # Imported after the environment is set up, as config is read at import time
+    import main
+    from entities import ENTITIES
+
+    rng = random.Random(args.seed)
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for path in args.entities or list(ENTITIES):
+                entity = ENTITIES[path]
+                rows = await sample_rows(client, path)
+                if not rows:
+                    continue
+                cursors = await collect_cursors(client, path, args.pages)
+                for workload in args.workloads:
+                    make_request = workload_requests(entity, workload, rows, cursors, rng)
+                    # A short warm-up so the first connections and caches aren't counted
+                    await drive(client, make_request, min(args.concurrency, args.requests), args.concurrency)
+                    latencies, errors, elapsed = await drive(client, make_request, args.requests, args.concurrency)
+                    result = summarize(path, workload, latencies, errors, elapsed)
+                    results.append(result)
+                    print(f"{path:18} {workload:8} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+                          f"{result['p99_ms']:9.2f} {result['throughput_rps']:10.1f} {errors:7d}", flush=True)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per entity and workload")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--pages", type=int, default=50, help="Cursor pages collected for the paging workload")
+    parser.add_argument("--entities", nargs="*", help="Entities to benchmark (default: all)")
+    parser.add_argument("--workloads", nargs="*", default=WORKLOADS, choices=WORKLOADS)
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="SCHOOL_API_MODE to run the app in")
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(
+            SCHOOL_DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            SCHOOL_SNAPSHOT_DIR=os.path.join(directory, "snapshots"),
+            SCHOOL_STUDENTS=str(args.students), SCHOOL_SEED=str(args.seed),
+            SCHOOL_API_MODE=args.mode, SCHOOL_CACHE_SIZE=os.environ.get("SCHOOL_CACHE_SIZE", "1024") if args.cache else "0",
+        )
+        print(f"{'entity':18} {'workload':8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>10} {'errors':>7}")
+        started = time.perf_counter()
+        results = asyncio.run(run_suite(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "commit": git_commit(), "python": platform.python_version(), "duration_s": time.perf_counter() - started,
+                "settings": {key: value for key, value in vars(args).items() if key != "output"},
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
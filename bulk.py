@@ -0,0 +1,207 @@
+import json
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from pydantic import ValidationError, create_model
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError
+from starlette.concurrency import run_in_threadpool
+
+from counts import row_counts
+from database import SessionLocal
+from entities import ENTITIES, Entity
+from filters import filter_clauses, filter_dependency
+
+# Rows written per executemany call and transaction
+BULK_CHUNK_SIZE = 1000
+
+router = APIRouter()
+
+
+def parse_row(entity: Entity, index: int, raw):
+    """Validate one incoming row with the entity's create schema, returning ``(values, error)``
+
+    An optional ``id`` is passed through so rows can be upserted on it.
+    """
+    if not isinstance(raw, dict):
+        return None, {"index": index, "errors": [{"msg": "Row must be a JSON object"}]}
+    raw = dict(raw)
+    row_id = raw.pop("id", None)
+    # bool is an int subclass, but true/false aren't ids
+    if row_id is not None and (isinstance(row_id, bool) or not isinstance(row_id, int)):
+        return None, {"index": index, "errors": [{"loc": ["id"], "msg": "id must be an integer"}]}
+    try:
+        values = entity.create_schema.model_validate(raw).model_dump()
+    except ValidationError as e:
+        return None, {"index": index, "errors": json.loads(e.json(include_url=False))}
+    if row_id is not None:
+        values["id"] = row_id
+    return values, None
+
+
+def insert_statements(entity: Entity, upsert: bool):
+    table = entity.model.__table__
+    plain = insert(table)
+    if not upsert:
+        return plain, plain
+    statement = sqlite_insert(table)
+    columns = {name: statement.excluded[name] for name in entity.create_schema.model_fields}
+    columns["updated_at"] = datetime.now(timezone.utc)
+    return plain, statement.on_conflict_do_update(index_elements=["id"], set_=columns)
+
+
+def write_chunk(entity: Entity, chunk: list, upsert: bool):
+    """Write ``(index, values)`` pairs in one transaction, returning ``(inserted, updated, errors)``
+
+    Rows are written with executemany in a savepoint; if that fails the chunk
+    is retried row by row so only the offending rows are reported.
+    """
+    plain, with_id = insert_statements(entity, upsert)
+    model = entity.model
+    inserted = updated = 0
+    errors = []
+    with SessionLocal() as db:
+        ids = [values["id"] for _, values in chunk if "id" in values]
+        existing = set(db.scalars(select(model.id).where(model.id.in_(ids)))) if upsert and ids else set()
+        # executemany needs every row to have the same keys
+        groups = [(plain, [item for item in chunk if "id" not in item[1]]), (with_id, [item for item in chunk if "id" in item[1]])]
+        for statement, items in groups:
+            if not items:
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(statement, [values for _, values in items])
+                written = items
+            except DBAPIError:
+                written = []
+                for index, values in items:
+                    try:
+                        with db.begin_nested():
+                            db.execute(statement, values)
+                        written.append((index, values))
+                    except DBAPIError as e:
+                        errors.append({"index": index, "errors": [{"msg": str(e.orig)}]})
+            for _, values in written:
+                if values.get("id") in existing:
+                    updated += 1
+                else:
+                    inserted += 1
+                    # An id repeated later in the chunk updates the row inserted here
+                    if "id" in values:
+                        existing.add(values["id"])
+        db.commit()
+    row_counts.adjust(model, inserted)
+    return inserted, updated, errors
+
+
+async def iter_rows(request: Request):
+    """Yield ``(index, raw row or None, parse error)`` from a JSON array or an NDJSON stream
+
+    A JSON body that isn't an array is a 400; in NDJSON an undecodable line is a row error.
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        index, buffer = 0, b""
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, *decode_line(index, line)
+                    index += 1
+        if buffer.strip():
+            yield index, *decode_line(index, buffer)
+        return
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        rows = None
+    # A malformed envelope isn't a row error, nothing is written
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for index, row in enumerate(rows):
+        yield index, row, None
+
+
+def decode_line(index: int, line: bytes):
+    try:
+        return json.loads(line), None
+    except ValueError:
+        return None, {"index": index, "errors": [{"msg": "Invalid JSON"}]}
+
+
+def add_bulk_create_route(entity: Entity):
+    async def bulk_create(request: Request, upsert: bool = Query(False, description="Update rows whose id already exists instead of failing them")):
+        inserted = updated = 0
+        errors = []
+        chunk = []
+        async for index, raw, error in iter_rows(request):
+            if error is None:
+                values, error = parse_row(entity, index, raw)
+            if error is not None:
+                errors.append(error)
+                continue
+            chunk.append((index, values))
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                chunk_inserted, chunk_updated, chunk_errors = await run_in_threadpool(write_chunk, entity, chunk, upsert)
+                inserted, updated, errors = inserted + chunk_inserted, updated + chunk_updated, errors + chunk_errors
+                chunk = []
+        if chunk:
+            chunk_inserted, chunk_updated, chunk_errors = await run_in_threadpool(write_chunk, entity, chunk, upsert)
+            inserted, updated, errors = inserted + chunk_inserted, updated + chunk_updated, errors + chunk_errors
+        return {"inserted": inserted, "updated": updated, "errors": errors}
+
+    bulk_create.__doc__ = (
+        f"Create {entity.path} from a JSON array or an NDJSON stream (Content-Type: application/x-ndjson) of "
+        f"{entity.create_schema.__name__} objects, optionally with an id. Rows are written in chunks of "
+        f"{BULK_CHUNK_SIZE}; invalid rows are reported by index without aborting the rest."
+    )
+    router.add_api_route(f"/{entity.path}/bulk", bulk_create, methods=["POST"], name=f"bulk_create_{entity.path}")
+
+
+def patch_schema(entity: Entity):
+    """The entity's create schema with every field omittable, for partial updates"""
+    # Only the presence is optional: null is still rejected where the create schema doesn't allow it
+    fields = {name: (field.annotation, None) for name, field in entity.create_schema.model_fields.items()}
+    return create_model(f"{entity.create_schema.__name__.removesuffix('Create')}Patch", **fields)
+
+
+def add_bulk_filter_routes(entity: Entity):
+    table = entity.model.__table__
+    Patch = patch_schema(entity)
+    filters_dependency = filter_dependency(entity)
+
+    def require_filters(filters: dict):
+        # Guard against rewriting or deleting a whole table by accident
+        if not filters:
+            raise HTTPException(status_code=400, detail="At least one filter is required")
+        return filter_clauses(entity, filters)
+
+    def bulk_update(changes: Patch = Body(...), filters: dict = Depends(filters_dependency)):
+        clauses = require_filters(filters)
+        values = changes.model_dump(exclude_unset=True)
+        if not values:
+            raise HTTPException(status_code=400, detail="No fields to update")
+        values["updated_at"] = datetime.now(timezone.utc)
+        with SessionLocal() as db:
+            result = db.execute(update(table).where(*clauses).values(**values))
+            db.commit()
+        return {"updated": result.rowcount}
+
+    def bulk_delete(filters: dict = Depends(filters_dependency)):
+        clauses = require_filters(filters)
+        with SessionLocal() as db:
+            result = db.execute(delete(table).where(*clauses))
+            db.commit()
+        row_counts.adjust(entity.model, -result.rowcount)
+        return {"deleted": result.rowcount}
+
+    bulk_update.__doc__ = f"Set the given fields on every {entity.label} matching the filters in one UPDATE, bumping updated_at"
+    bulk_delete.__doc__ = f"Delete every {entity.label} matching the filters in one DELETE"
+    router.add_api_route(f"/{entity.path}/bulk", bulk_update, methods=["PATCH"], name=f"bulk_update_{entity.path}")
+    router.add_api_route(f"/{entity.path}/bulk", bulk_delete, methods=["DELETE"], name=f"bulk_delete_{entity.path}")
+
+
+for entity in ENTITIES.values():
+    add_bulk_create_route(entity)
+    add_bulk_filter_routes(entity)
@@ -0,0 +1,217 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import format_datetime
+from datetime import timezone
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+import config
+from database import SessionLocal
+from entities import ENTITIES, ENTITIES_BY_MODEL
+from expansion import relationship_attribute
+
+
+# Methods whose requests can change the data, anything else leaves the cache alone
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: list
+    body: bytes
+    etag: str
+    # Table generations the response was read at, it is stale once any of them moves on
+    generations: dict
+    expires: float
+    # The route that built it, restored into the scope on a hit for the instrumentation middleware
+    route: object = None
+
+
+class ResponseCache:
+    """LRU of responses with a TTL, invalidated per table through generation counters
+
+    Writes bump the generation of the tables they touch instead of hunting
+    down the entries built from them, so invalidation is O(1) and a read that
+    raced with a write can't store a stale response under the new generation.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {path: 0 for path in ENTITIES}
+        self._lock = threading.Lock()
+
+    def generations(self, tables) -> dict:
+        with self._lock:
+            return {table: self._generations[table] for table in tables}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires < time.monotonic() or any(
+                    self._generations[table] != generation for table, generation in entry.generations.items()):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tables=None):
+        """Expire every response read from ``tables`` (all of them by default)"""
+        with self._lock:
+            for table in tables if tables is not None else list(self._generations):
+                self._generations[table] += 1
+
+
+response_cache = ResponseCache(config.CACHE_SIZE, config.CACHE_TTL_SECONDS)
+
+
+def relationship_tables(entity, name: str) -> list:
+    """The entity tables read to expand ``name``: its target and any association tables in between"""
+    relationship = relationship_attribute(entity, name).property
+    tables = [ENTITIES_BY_MODEL[relationship.mapper.class_].path]
+    if relationship.secondary is not None:
+        # Class.students goes through class_enrolments and enrolments
+        tables += [other.path for other in ENTITIES.values() if relationship.secondary.is_derived_from(other.model.__table__)]
+    return tables
+
+
+def cached_tables(path: str, params: list):
+    """The entity tables a GET on ``path`` reads, or None when its response isn't cached"""
+    segments = path.strip("/").split("/")
+    entity = ENTITIES.get(segments[0])
+    if entity is None or len(segments) > 2 or segments[-1] == "bulk":
+        return None
+    tables = [entity.path]
+    for key, value in params:
+        if key == "expand":
+            for name in value.split(","):
+                if name.strip() in entity.expandable:
+                    tables += relationship_tables(entity, name.strip())
+    return tables
+
+
+def written_tables(path: str):
+    """The entity tables a write to ``path`` can change, None meaning all of them"""
+    segment = path.strip("/").split("/")[0]
+    if segment in ENTITIES:
+        return [segment]
+    if segment == "reset":
+        return None
+    return []
+
+
+def last_modified(tables) -> str:
+    with SessionLocal() as db:
+        stamps = [db.scalar(select(func.max(ENTITIES[table].model.updated_at))) for table in tables]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return format_datetime(max(stamps).replace(tzinfo=timezone.utc), usegmt=True) if stamps else None
+
+
+class ResponseCacheMiddleware:
+    """Serve repeated GETs of the entity routes from ``response_cache``
+
+    Responses carry an ETag (a hash of the body) and Last-Modified (the latest
+    updated_at of the tables read), and a matching If-None-Match gets a 304.
+    A POST, PUT, PATCH or DELETE on an entity route, and /reset/, invalidates
+    the tables it touches once it has run. Only writes made through this process are
+    seen, other workers' writes show up after the TTL.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.cache.size <= 0:
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] in WRITE_METHODS:
+            tables = written_tables(scope["path"])
+            if tables is not None and not tables:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_after_invalidating(message):
+                # The write is committed by now; invalidate before the client can read its own write
+                if message["type"] == "http.response.start":
+                    self.cache.invalidate(tables)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_after_invalidating)
+            finally:
+                self.cache.invalidate(tables)
+            return
+        if scope["method"] != "GET":
+            # HEAD, OPTIONS (CORS preflights): neither cached nor a write
+            await self.app(scope, receive, send)
+            return
+
+        params = sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True))
+        tables = cached_tables(scope["path"], params)
+        if tables is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        # The host is part of the key as the next links are absolute URLs
+        key = (headers.get(b"host"), scope["path"], urlencode(params))
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        entry = self.cache.get(key)
+        if entry is not None:
+            scope["route"] = entry.route
+            await self.respond(send, entry, if_none_match, b"HIT")
+            return
+
+        generations = self.cache.generations(tables)
+        start, chunks = None, []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            else:
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        response_headers = [(name, value) for name, value in start["headers"] if name.lower() != b"content-length"]
+        entry = CachedResponse(start["status"], response_headers, body, f'"{hashlib.sha1(body).hexdigest()}"',
+                               generations, time.monotonic() + self.cache.ttl, scope.get("route"))
+        if start["status"] == 200:
+            modified = await run_in_threadpool(last_modified, tables)
+            if modified:
+                entry.headers.append((b"last-modified", modified.encode("latin-1")))
+            self.cache.put(key, entry)
+        await self.respond(send, entry, if_none_match, b"MISS")
+
+    async def respond(self, send, entry: CachedResponse, if_none_match: str, status: bytes):
+        if entry.status != 200:
+            await send({"type": "http.response.start", "status": entry.status,
+                        "headers": entry.headers + [(b"content-length", str(len(entry.body)).encode("latin-1"))]})
+            await send({"type": "http.response.body", "body": entry.body})
+            return
+        headers = entry.headers + [(b"etag", entry.etag.encode("latin-1")), (b"x-cache", status)]
+        if entry.etag in (tag.strip() for tag in if_none_match.split(",")):
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers.append((b"content-length", str(len(entry.body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
@@ -0,0 +1,131 @@
+import json
+import uuid
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, text
+
+from database import SessionLocal
+from entities import ENTITIES, Entity
+from models import ChangeLog, DatasetInfo
+
+# Log rows fetched per round trip and per streamed chunk
+CHANGES_BATCH_SIZE = 1000
+
+router = APIRouter()
+
+
+def row_image(entity: Entity, row: str) -> str:
+    # The row as stored by SQLite, turned into API fields by the read schema when served
+    pairs = ", ".join(f"'{name}', {row}.{name}" for name in entity.schema.model_fields)
+    return f"json_object({pairs})"
+
+
+def change_triggers(entity: Entity) -> dict:
+    """CREATE TRIGGER statements logging every insert, update and delete of ``entity``'s table"""
+    table = entity.model.__tablename__
+    insert = ("INSERT INTO change_log (entity, row_id, operation, changed_at, data) "
+              "VALUES ('{path}', {row}.id, '{operation}', strftime('%Y-%m-%dT%H:%M:%fZ', 'now'), {data})")
+    statements = {}
+    for operation, event, row in [("insert", "INSERT", "NEW"), ("update", "UPDATE", "NEW"), ("delete", "DELETE", "OLD")]:
+        data = "NULL" if operation == "delete" else row_image(entity, row)
+        body = insert.format(path=entity.path, row=row, operation=operation, data=data)
+        statements[f"{table}_change_{operation}"] = (
+            f"CREATE TRIGGER IF NOT EXISTS {table}_change_{operation} AFTER {event} ON {table} "
+            f"FOR EACH ROW BEGIN {body}; END")
+    return statements
+
+
+def install_change_triggers(bind):
+    """Log changes to every entity table from now on (a no-op where the triggers exist)
+
+    The triggers write in the same transaction as the change itself, whichever
+    route made it. Generated data is loaded before they are installed, so the
+    log starts empty.
+    """
+    with bind.begin() as connection:
+        for entity in ENTITIES.values():
+            for statement in change_triggers(entity).values():
+                connection.execute(text(statement))
+
+
+def start_change_log_epoch(bind) -> str:
+    """Give the change log a new epoch, after generating the data or restoring a snapshot
+
+    A restore rewinds the log and its sequence numbers are handed out again,
+    so positions in the log are only meaningful together with their epoch.
+    """
+    epoch = uuid.uuid4().hex
+    with bind.begin() as connection:
+        connection.execute(DatasetInfo.__table__.delete().where(DatasetInfo.key == "change_log_epoch"))
+        connection.execute(DatasetInfo.__table__.insert().values(key="change_log_epoch", value=epoch))
+    return epoch
+
+
+def current_epoch(db) -> Optional[str]:
+    return db.scalar(select(DatasetInfo.value).where(DatasetInfo.key == "change_log_epoch"))
+
+
+def head_sequence(db) -> int:
+    return db.scalar(select(func.coalesce(func.max(ChangeLog.seq), 0)))
+
+
+def parse_since(since: Optional[str]):
+    """Split a ``<epoch>:<seq>`` position into ``(epoch, seq)``, None reading from the start of the log"""
+    if since is None or since == "0":
+        return None, 0
+    epoch, _, seq = since.rpartition(":")
+    if not epoch or not seq.isdigit():
+        raise HTTPException(status_code=400, detail="since must be '<epoch>:<seq>', as returned by /changes/head")
+    return epoch, int(seq)
+
+
+def dump_change(change: ChangeLog, epoch: str) -> dict:
+    data = None
+    if change.data is not None:
+        data = ENTITIES[change.entity].schema.model_validate(json.loads(change.data)).model_dump(mode="json")
+    return {"seq": change.seq, "epoch": epoch, "since": f"{epoch}:{change.seq}", "entity": change.entity,
+            "id": change.row_id, "operation": change.operation, "changed_at": change.changed_at, "data": data}
+
+
+def iter_changes(statement, epoch: str):
+    db = SessionLocal()
+    try:
+        result = db.scalars(statement.execution_options(yield_per=CHANGES_BATCH_SIZE))
+        for partition in result.partitions():
+            yield "".join(json.dumps(dump_change(change, epoch)) + "\n" for change in partition)
+    finally:
+        db.close()
+
+
+@router.get("/changes/head")
+def read_changes_head():
+    """The current position of the log, to start following /changes from before a full export"""
+    with SessionLocal() as db:
+        epoch, seq = current_epoch(db), head_sequence(db)
+    return {"epoch": epoch, "seq": seq, "since": f"{epoch}:{seq}"}
+
+
+@router.get("/changes")
+def read_changes(
+    since: Optional[str] = Query(None, description="Return changes after this position: the `since` of the last change you applied, or of /changes/head (`<epoch>:<seq>`). Omit it to read the whole log"),
+    entity: Optional[List[str]] = Query(None, description="Only changes to these entities (repeat the parameter for several)"),
+    limit: Optional[int] = Query(None, description="Maximum number of changes to return"),
+):
+    """Stream inserts, updates and deletes (tombstones with data null) as NDJSON, in commit order"""
+    unknown = [path for path in entity or [] if path not in ENTITIES]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown entity '{unknown[0]}'")
+    since_epoch, since_seq = parse_since(since)
+    with SessionLocal() as db:
+        epoch = current_epoch(db)
+        # POST /reset/ rewinds the log with the data and starts a new epoch, so the client has to resync
+        if since_epoch is not None and (since_epoch != epoch or since_seq > head_sequence(db)):
+            raise HTTPException(status_code=410, detail="since is from another change log epoch, resync from a full export")
+    statement = select(ChangeLog).where(ChangeLog.seq > since_seq).order_by(ChangeLog.seq)
+    if entity:
+        statement = statement.where(ChangeLog.entity.in_(entity))
+    if limit is not None:
+        statement = statement.limit(limit)
+    return StreamingResponse(iter_changes(statement, epoch), media_type="application/x-ndjson")
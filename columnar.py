@@ -0,0 +1,82 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+import duckdb
+from fastapi import HTTPException
+from sqlalchemy import Boolean, Date, DateTime, Integer
+
+from database import engine
+from entities import Entity
+from pagination import get_sort_column
+
+
+@lru_cache(maxsize=None)
+def install_sqlite_extension() -> Optional[str]:
+    """Make DuckDB's sqlite extension available, once per process
+
+    It is only downloaded when it isn't installed already. Returns why it
+    can't be loaded, or None.
+    """
+    con = duckdb.connect()
+    try:
+        con.execute("LOAD sqlite")
+    except duckdb.Error:
+        try:
+            con.execute("INSTALL sqlite")
+            con.execute("LOAD sqlite")
+        except duckdb.Error as e:
+            return str(e)
+    finally:
+        con.close()
+    return None
+
+
+def connect_duckdb() -> duckdb.DuckDBPyConnection:
+    """Open an in-memory DuckDB connection with the SQLite database attached read-only as ``school``
+
+    Raises a 503 when DuckDB's sqlite extension can't be installed (e.g. no
+    network access to the extension repository).
+    """
+    error = install_sqlite_extension()
+    if error is not None:
+        raise HTTPException(status_code=503, detail=f"DuckDB's sqlite extension is unavailable: {error}")
+    con = duckdb.connect()
+    try:
+        con.execute("LOAD sqlite")
+        path = engine.url.database.replace("'", "''")
+        con.execute(f"ATTACH '{path}' AS school (TYPE SQLITE, READ_ONLY)")
+    except duckdb.Error as e:
+        con.close()
+        raise HTTPException(status_code=503, detail=f"Cannot attach the database to DuckDB: {e}")
+    return con
+
+
+def _duckdb_type(column) -> str:
+    # SQLite stores booleans as integers and dates as text, so cast to the types the model declares
+    if isinstance(column.type, Boolean):
+        return "BOOLEAN"
+    if isinstance(column.type, DateTime):
+        return "TIMESTAMP"
+    if isinstance(column.type, Date):
+        return "DATE"
+    if isinstance(column.type, Integer):
+        return "BIGINT"
+    return "VARCHAR"
+
+
+def build_columnar_query(entity: Entity, sort: Optional[str], order: Optional[str], updated_after: Optional[datetime]):
+    """Return ``(sql, params)`` selecting the entity's API fields from the attached SQLite file"""
+    table = entity.model.__table__
+    columns = ", ".join(
+        f'CAST("{name}" AS {_duckdb_type(table.columns[name])}) AS "{name}"' for name in entity.schema.model_fields
+    )
+    sql = f'SELECT {columns} FROM school."{table.name}"'
+    params = []
+    if updated_after:
+        sql += " WHERE CAST(updated_at AS TIMESTAMP) > ?"
+        params.append(updated_after.replace(tzinfo=None))
+    sort_column = get_sort_column(entity.model, sort)
+    direction = "DESC" if order == "desc" else "ASC"
+    sql += f' ORDER BY "{sort_column.key}" {direction}, id {direction}'
+    return sql, params
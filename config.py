@@ -0,0 +1,54 @@
+import os
+
+
+def env_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def env_int(name: str, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# SQLAlchemy URL of the SQLite database
+DATABASE_URL = os.environ.get("SCHOOL_DATABASE_URL", "sqlite:///mock_school.db")
+
+# "sync" serves every route from FastAPI's threadpool, "async" serves the list and
+# get-by-id routes from async handlers on an aiosqlite engine (needs the async extra)
+API_MODE = os.environ.get("SCHOOL_API_MODE", "sync")
+
+# SQLite engine profile: "tuned" (WAL, relaxed fsync, mmap, bigger cache) or "default" (SQLite's own settings)
+DB_PROFILE = os.environ.get("SCHOOL_DB_PROFILE", "tuned")
+# Pragma overrides for the tuned profile
+DB_MMAP_SIZE = env_int("SCHOOL_DB_MMAP_SIZE", 256 * 1024 * 1024)
+DB_CACHE_SIZE_KIB = env_int("SCHOOL_DB_CACHE_SIZE_KIB", 16 * 1024)
+DB_BUSY_TIMEOUT_MS = env_int("SCHOOL_DB_BUSY_TIMEOUT_MS", 5000)
+# Connection pool. Sync requests keep their connection until the response has been
+# serialized on another threadpool worker, so a capped overflow can deadlock under
+# load; SQLite connections are cheap, so overflow is unbounded by default (-1).
+DB_POOL_SIZE = env_int("SCHOOL_DB_POOL_SIZE", 20)
+DB_MAX_OVERFLOW = env_int("SCHOOL_DB_MAX_OVERFLOW", -1)
+
+# Throw away the existing database on startup even if it is compatible
+REGENERATE = env_flag("SCHOOL_REGENERATE")
+
+# Size and seed of the generated dataset. Unset values use the data_generation
+# defaults and accept whatever an existing database was generated with.
+STUDENTS = env_int("SCHOOL_STUDENTS", None)
+ATTENDANCES_PER_ENROLMENT = env_int("SCHOOL_ATTENDANCES_PER_ENROLMENT", None)
+INCIDENTS = env_int("SCHOOL_INCIDENTS", None)
+SEED = env_int("SCHOOL_SEED", None)
+
+# Worker processes used to generate the dataset
+WORKERS = env_int("SCHOOL_WORKERS", 1)
+
+# Directory holding database snapshots restored by /reset/
+SNAPSHOT_DIR = os.environ.get("SCHOOL_SNAPSHOT_DIR", "snapshots")
+
+# In-process cache of GET responses from the entity routes: entries kept (0 disables
+# it) and seconds before an entry is refetched even without a write through this process
+CACHE_SIZE = env_int("SCHOOL_CACHE_SIZE", 1024)
+CACHE_TTL_SECONDS = env_int("SCHOOL_CACHE_TTL_SECONDS", 60)
+
+# Log statements taking at least this many milliseconds, with their query plan (unset disables the log)
+SLOW_QUERY_MS = env_int("SCHOOL_SLOW_QUERY_MS", None)
@@ -0,0 +1,60 @@
+from enum import Enum
+from threading import Lock
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+
+class TotalMode(str, Enum):
+    false = "false"
+    exact = "exact"
+    estimate = "estimate"
+
+
+class RowCounts:
+    """Cached per-table row counts, kept current by the create and delete handlers"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = Lock()
+
+    def get(self, db: Session, model) -> int:
+        count = self.cached(model)
+        if count is None:
+            # Seed the cache with a single COUNT(*) the first time the table is asked for
+            count = self.seed(model, db.query(func.count(model.id)).scalar())
+        return count
+
+    def cached(self, model) -> Optional[int]:
+        with self._lock:
+            return self._counts.get(model.__tablename__)
+
+    def seed(self, model, count: int) -> int:
+        with self._lock:
+            return self._counts.setdefault(model.__tablename__, count)
+
+    def adjust(self, model, delta: int):
+        with self._lock:
+            if model.__tablename__ in self._counts:
+                self._counts[model.__tablename__] += delta
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+row_counts = RowCounts()
+
+
+def count_total(db: Session, query, model, mode: TotalMode):
+    """Return the ``total`` for a list response according to ``include_total``
+
+    ``exact`` counts the filtered query, ``estimate`` serves the cached table
+    row count (ignoring filters) and ``false`` skips counting altogether.
+    """
+    if mode == TotalMode.false:
+        return None
+    if mode == TotalMode.estimate:
+        return row_counts.get(db, model)
+    return query.order_by(None).count()
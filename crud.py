@@ -0,0 +1,110 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from counts import TotalMode, count_total, row_counts
+from database import get_db
+from entities import ENTITIES, Entity
+from expansion import EXPAND_DESCRIPTION, dump_expanded, expand_options, parse_expand
+from filters import filter_clauses, filter_dependency
+from pagination import paginate
+from projection import FIELDS_DESCRIPTION, all_fields, parse_fields, projected_columns
+from schemas import PaginatedResponse
+from serializers import dump_rows, json_response
+
+router = APIRouter()
+
+
+def add_crud_routes(entity: Entity):
+    """Register list, get, create, update and delete routes for ``entity``"""
+    model, schema, create_schema = entity.model, entity.schema, entity.create_schema
+    not_found = f"{entity.label} not found"
+
+    def get_or_404(db: Session, item_id: int):
+        item = db.get(model, item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail=not_found)
+        return item
+
+    def read_items(
+        request: Request,
+        db: Session = Depends(get_db),
+        page: Optional[int] = Query(None, ge=1, description="Page number, starting at 1 (only use one of page or offset)"),
+        limit: int = Query(10, ge=1, description=f"Number of {entity.path} to retrieve"),
+        offset: Optional[int] = Query(None, ge=0, description=f"Number of {entity.path} to skip (only use one of page or offset)"),
+        cursor: Optional[str] = Query(None, description="Cursor from the previous page's next link (used by default when page and offset are not given)"),
+        sort: Optional[str] = Query(None, description="Field to sort by"),
+        order: Optional[str] = Query(None, description="Sort order (asc or desc)"),
+        include_total: TotalMode = Query(TotalMode.exact, description="How to compute total: false skips it, exact counts the filtered rows, estimate uses the cached table row count"),
+        fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+        expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+        filters: dict = Depends(filter_dependency(entity)),
+    ):
+        names, expanded = parse_fields(entity, fields), parse_expand(entity, expand)
+        if names and expanded:
+            raise HTTPException(status_code=400, detail="fields and expand can't be combined")
+        # Without expand only the columns are selected, no ORM objects are built
+        names = names or all_fields(entity)
+        query = db.query(model).options(*expand_options(entity, expanded)) if expanded else db.query(*projected_columns(entity, names, sort))
+        query = query.filter(*filter_clauses(entity, filters))
+        total = count_total(db, query, model, include_total)
+        items, next_url = paginate(request, query, model, limit=limit, offset=offset, page=page, cursor=cursor, sort=sort, order=order)
+        # Encoded directly rather than validated again against response_model, which only documents the shape
+        if expanded:
+            return json_response({"items": dump_expanded(entity, expanded, items), "total": total, "next": next_url})
+        return json_response({"items": dump_rows(entity, names, items), "total": total, "next": next_url})
+
+    def create_item(values: create_schema, db: Session = Depends(get_db)):
+        item = model(**values.model_dump())
+        db.add(item)
+        db.commit()
+        db.refresh(item)
+        row_counts.adjust(model, 1)
+        return item
+
+    def get_item(item_id: int, fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+                 expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION), db: Session = Depends(get_db)):
+        names, expanded = parse_fields(entity, fields), parse_expand(entity, expand)
+        if names and expanded:
+            raise HTTPException(status_code=400, detail="fields and expand can't be combined")
+        if expanded:
+            item = db.get(model, item_id, options=expand_options(entity, expanded))
+            if not item:
+                raise HTTPException(status_code=404, detail=not_found)
+            return json_response(dump_expanded(entity, expanded, [item])[0])
+        names = names or all_fields(entity)
+        row = db.query(*projected_columns(entity, names)).filter(model.id == item_id).first()
+        if not row:
+            raise HTTPException(status_code=404, detail=not_found)
+        return json_response(dump_rows(entity, names, [row])[0])
+
+    def update_item(item_id: int, values: create_schema, db: Session = Depends(get_db)):
+        item = get_or_404(db, item_id)
+        for key, value in values.model_dump().items():
+            setattr(item, key, value)
+        db.commit()
+        db.refresh(item)
+        return item
+
+    def delete_item(item_id: int, db: Session = Depends(get_db)):
+        item = get_or_404(db, item_id)
+        db.delete(item)
+        db.commit()
+        row_counts.adjust(model, -1)
+        return item
+
+    router.add_api_route(f"/{entity.path}/", read_items, methods=["GET"],
+                         response_model=PaginatedResponse[schema], name=f"read_{entity.path}")
+    router.add_api_route(f"/{entity.path}/", create_item, methods=["POST"],
+                         response_model=schema, name=f"create_{entity.path}")
+    router.add_api_route(f"/{entity.path}/{{item_id}}", get_item, methods=["GET"],
+                         response_model=schema, name=f"get_{entity.path}_by_id")
+    router.add_api_route(f"/{entity.path}/{{item_id}}", update_item, methods=["PUT"],
+                         response_model=schema, name=f"update_{entity.path}")
+    router.add_api_route(f"/{entity.path}/{{item_id}}", delete_item, methods=["DELETE"],
+                         response_model=schema, name=f"delete_{entity.path}")
+
+
+for entity in ENTITIES.values():
+    add_crud_routes(entity)
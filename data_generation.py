@@ -1,30 +1,213 @@
+from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
-from models import Geography as GeographyModel, School as SchoolModel, Student as StudentModel, ScholasticYear as ScholasticYearModel, Class as ClassModel, Attendance as AttendanceModel, Enrolment as EnrolmentModel, Incident as IncidentModel, ClassEnrolment as ClassEnrolmentModel
+from models import Base, SCHEMA_VERSION, DatasetInfo, Geography as GeographyModel, School as SchoolModel, Student as StudentModel, ScholasticYear as ScholasticYearModel, Class as ClassModel, Attendance as AttendanceModel, Enrolment as EnrolmentModel, Incident as IncidentModel, ClassEnrolment as ClassEnrolmentModel
+from rollups import drop_rollup_triggers, rebuild_rollups
 from faker import Faker
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import date, datetime, timezone, timedelta
+from typing import Optional
+import argparse
 import random
+import time
 
-def get_random_past_datetime():
+# Rows per executemany call when bulk inserting generated data
+BATCH_SIZE = 10_000
+# Number of distinct Faker names drawn for the name pools
+NAME_POOL_SIZE = 1_000
+# Students per generation shard; fixed so output doesn't depend on the worker count
+SHARD_SIZE = 10_000
+
+YEARS = ["K", "1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12"]
+SUBJECTS = ["English", "Maths", "Science"]
+SES_OPTIONS = ["High", "Medium", "Low"]
+INCIDENT_TYPES = ["Poor Behaviour", "Injury"]
+
+
+@dataclass(frozen=True)
+class Scale:
+    """How much data populate_data generates"""
+    students: int = 100
+    attendances_per_enrolment: int = 10
+    incidents: int = 50
+
+
+def get_random_past_datetime(rng=random):
     """Helper function to generate random past datetime"""
-    days_ago = random.randint(1, 365)
+    days_ago = rng.randint(1, 365)
     return datetime.now(timezone.utc) - timedelta(days=days_ago)
 
-def populate_data(db: Session):
+
+def random_date(rng: random.Random, start: date, end: date) -> date:
+    """Uniform random date between start and end inclusive (much cheaper than faker.date_between)"""
+    return date.fromordinal(rng.randint(start.toordinal(), end.toordinal()))
+
+
+def next_id(db: Session, model) -> int:
+    return (db.query(model.id).order_by(model.id.desc()).limit(1).scalar() or 0) + 1
+
+
+def to_sqlite_datetime(value: datetime) -> str:
+    """Format a datetime the way SQLAlchemy's SQLite DateTime type stores it"""
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def insert_batches(db: Session, model, columns, rows):
+    """Insert an iterable of row tuples with executemany, BATCH_SIZE rows at a time
+
+    Rows are handed to the driver as-is, so values must already be in their
+    SQLite storage form (ISO date strings, 0/1 booleans): skipping
+    SQLAlchemy's per-value bind processing is most of the speed-up.
+    """
+    connection = db.connection()
+    statement = f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            connection.exec_driver_sql(statement, batch)
+            batch = []
+    if batch:
+        connection.exec_driver_sql(statement, batch)
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    """Everything a worker needs to generate one shard of students and their rows"""
+    seed: int
+    first_student_id: int
+    first_enrolment_id: int
+    students: int
+    incidents: int
+    attendances_per_enrolment: int
+    school_ids: list
+    class_ids: list
+    class_ids_by_name: dict
+    first_names: list
+    last_names: list
+    stamp: str
+    today: date
+
+
+# Column order of the tuples generate_shard returns for each table
+SHARD_TABLES = [
+    (StudentModel, ("id", "first_name", "last_name", "socio_economic_status", "created_at", "updated_at")),
+    (EnrolmentModel, ("id", "student_id", "school_id", "start_date", "end_date", "created_at", "updated_at")),
+    (ClassEnrolmentModel, ("enrolment_id", "class_id", "calendar_year", "created_at", "updated_at")),
+    (AttendanceModel, ("student_id", "class_id", "present", "attendance_date", "created_at", "updated_at")),
+    (IncidentModel, ("incident_type", "reported_datetime", "student_id", "created_at", "updated_at")),
+]
+
+
+def derive_seed(seed: int, shard: int) -> int:
+    """Seed for one shard, derived from the master seed and the shard number only"""
+    return random.Random(f"{seed}:{shard}").getrandbits(64)
+
+
+def generate_shard(spec: ShardSpec) -> dict:
+    """Generate the per-student rows of one shard, keyed by table name
+
+    Runs in worker processes, so it only touches its own RNG and returns
+    plain tuples in SQLite storage form.
+    """
+    rng = random.Random(spec.seed)
+    today, stamp = spec.today, spec.stamp
+    six_years_ago, one_year_ago = today - timedelta(days=round(6 * 365.25)), today - timedelta(days=365)
+    students, enrolments, class_enrolments, attendances, incidents = [], [], [], [], []
+
+    # Students with socio-economic status, and one enrolment each
+    student_ses = []
+    for offset in range(spec.students):
+        student_id, enrolment_id = spec.first_student_id + offset, spec.first_enrolment_id + offset
+        ses = rng.choice(SES_OPTIONS)
+        student_ses.append(ses)
+        students.append((student_id, rng.choice(spec.first_names), rng.choice(spec.last_names), ses, stamp, stamp))
+
+        start_date = random_date(rng, six_years_ago, one_year_ago)
+        end_date = random_date(rng, one_year_ago, today) if rng.random() > 0.8 else None
+        enrolments.append((enrolment_id, student_id, rng.choice(spec.school_ids), start_date.isoformat(),
+                           end_date.isoformat() if end_date else None, stamp, stamp))
+
+        # Enrol each student in classes based on the number of years enrolled
+        num_years_enrolled = (end_date or today).year - start_date.year + 1
+        for i in range(min(num_years_enrolled, len(YEARS))):
+            for subject in SUBJECTS:
+                class_enrolments.append((enrolment_id, spec.class_ids_by_name[f"{subject} {YEARS[i]}"],
+                                         start_date.year + i - 1, stamp, stamp))
+
+        # Attendances, with lower attendance rates for lower socio-economic status
+        for _ in range(spec.attendances_per_enrolment):
+            if ses == "Low":
+                present = rng.random() < 0.2
+            elif ses == "Medium":
+                present = rng.random() < 0.1
+            else:
+                present = rng.choice([True, False])
+            attendances.append((student_id, rng.choice(spec.class_ids), int(present),
+                                random_date(rng, start_date, end_date or today).isoformat(), stamp, stamp))
+
+    # Incidents, repeated more often for lower socio-economic status
+    incident_multiplier = {"Low": 3, "Medium": 2, "High": 1}
+    for _ in range(spec.incidents):
+        incident_date = random_date(rng, six_years_ago, today).isoformat()
+        index = rng.randrange(spec.students)
+        for _ in range(incident_multiplier[student_ses[index]]):
+            incidents.append((rng.choice(INCIDENT_TYPES), incident_date, spec.first_student_id + index, stamp, stamp))
+
+    return {"students": students, "enrolments": enrolments, "class_enrolments": class_enrolments,
+            "attendances": attendances, "incidents": incidents}
+
+
+def map_shards(shards: list, workers: int):
+    """Yield generate_shard results in shard order, running up to ``workers`` processes
+
+    At most two shards per worker are in flight so finished shards don't pile
+    up in memory while the writer catches up.
+    """
+    if workers <= 1:
+        yield from map(generate_shard, shards)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for spec in shards:
+            pending.append(executor.submit(generate_shard, spec))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def populate_data(db: Session, scale: Scale = Scale(), seed: Optional[int] = None, workers: int = 1):
+    """Generate the mock school dataset in a single transaction
+
+    Reference data (geographies, schools, years, classes) goes through the
+    ORM. Students and their rows are generated in shards of SHARD_SIZE,
+    optionally across ``workers`` processes, each from a seed derived from
+    the master seed, so a given seed gives the same data for any worker
+    count. Shards are bulk inserted with explicit ids, so no row ever needs
+    a lookup query.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
     faker = Faker()
-    now = datetime.now(timezone.utc)
+    faker.seed_instance(seed)
+    stamp = to_sqlite_datetime(datetime.now(timezone.utc))
+    today = date.today()
 
     # Add Geography Data with random past created_at dates
     geographies = [
-        {"city": "King's Landing", "region": "Crownlands", "created_at": get_random_past_datetime()},
-        {"city": "Winterfell", "region": "The North", "created_at": get_random_past_datetime()},
-        {"city": "Highgarden", "region": "The Reach", "created_at": get_random_past_datetime()},
-        {"city": "Sunspear", "region": "Dorne", "created_at": get_random_past_datetime()},
-        {"city": "Pyke", "region": "Iron Islands", "created_at": get_random_past_datetime()},
+        {"city": "King's Landing", "region": "Crownlands", "created_at": get_random_past_datetime(rng)},
+        {"city": "Winterfell", "region": "The North", "created_at": get_random_past_datetime(rng)},
+        {"city": "Highgarden", "region": "The Reach", "created_at": get_random_past_datetime(rng)},
+        {"city": "Sunspear", "region": "Dorne", "created_at": get_random_past_datetime(rng)},
+        {"city": "Pyke", "region": "Iron Islands", "created_at": get_random_past_datetime(rng)},
     ]
 
     geo_objects = [GeographyModel(**geo) for geo in geographies]
     db.add_all(geo_objects)
-    db.commit()
+    db.flush()
 
     # Add Schools
     schools = [
@@ -35,80 +218,85 @@ def populate_data(db: Session):
 
     school_objects = [SchoolModel(**school) for school in schools]
     db.add_all(school_objects)
-    db.commit()
-
-    # Assign socio-economic status and add Students
-    ses_options = ["High", "Medium", "Low"]
-    students = [StudentModel(first_name=faker.first_name(), last_name=faker.last_name(), socio_economic_status=random.choice(ses_options)) for _ in range(100)]
-    db.add_all(students)
-    db.commit()
+    db.flush()
+    school_ids = [school.id for school in school_objects]
 
     # Add Scholastic Years and Classes
-    years = ["K", "1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12"]
-    subjects = ["English", "Maths", "Science"]
-    year_objects = [ScholasticYearModel(year=year) for year in years]
+    year_objects = [ScholasticYearModel(year=year) for year in YEARS]
     db.add_all(year_objects)
-    db.commit()
+    db.flush()
 
     class_objects = []
     for year_obj in year_objects:
-        for subject in subjects:
+        for subject in SUBJECTS:
             class_name = f"{subject} {year_obj.year}"
             class_obj = ClassModel(subject=subject, name=class_name, scholastic_year_id=year_obj.id)
             class_objects.append(class_obj)
     db.add_all(class_objects)
-    db.commit()
+    db.flush()
+    class_ids = [class_obj.id for class_obj in class_objects]
+    class_ids_by_name = {class_obj.name: class_obj.id for class_obj in class_objects}
 
-    # Add Enrolments
-    for student in students:
-        enrolment_start = faker.date_between(start_date='-6y', end_date='-1y')
-        enrolment_end = faker.date_between(start_date='-1y', end_date='today') if random.random() > 0.8 else None
-        school_id = random.choice(school_objects).id
-        enrolment = EnrolmentModel(student_id=student.id, school_id=school_id, start_date=enrolment_start, end_date=enrolment_end)
-        db.add(enrolment)
-        db.commit()
-
-        # Calculate the number of years the student is enrolled 
-        num_years_enrolled = (enrolment.end_date or date.today()).year - enrolment.start_date.year + 1
-
-        # Enrol each student in classes based on the number of years enrolled 
-        for i in range(num_years_enrolled): 
-            if i >= len(years): 
-                break 
-            for subject in ["English", "Maths", "Science"]: 
-                class_name = f"{subject} {years[i]}" 
-                class_obj = db.query(ClassModel).filter(ClassModel.name == class_name).first() 
-                class_enrolment = ClassEnrolmentModel(enrolment_id=enrolment.id, class_id=class_obj.id, calendar_year=enrolment.start_date.year + i - 1) 
-                db.add(class_enrolment)
+    # Name pools are drawn once from the master seed and shared by every shard
+    first_names = [faker.first_name() for _ in range(NAME_POOL_SIZE)]
+    last_names = [faker.last_name() for _ in range(NAME_POOL_SIZE)]
+    first_student_id = next_id(db, StudentModel)
+    first_enrolment_id = next_id(db, EnrolmentModel)
 
-    db.commit()
+    shards = []
+    for shard, shard_start in enumerate(range(0, scale.students, SHARD_SIZE)):
+        shard_end = min(shard_start + SHARD_SIZE, scale.students)
+        shards.append(ShardSpec(
+            seed=derive_seed(seed, shard),
+            first_student_id=first_student_id + shard_start,
+            first_enrolment_id=first_enrolment_id + shard_start,
+            students=shard_end - shard_start,
+            # Spread incidents over shards by student count, independently of the worker count
+            incidents=scale.incidents * shard_end // scale.students - scale.incidents * shard_start // scale.students,
+            attendances_per_enrolment=scale.attendances_per_enrolment,
+            school_ids=school_ids, class_ids=class_ids, class_ids_by_name=class_ids_by_name,
+            first_names=first_names, last_names=last_names, stamp=stamp, today=today,
+        ))
 
-    # Add Attendances
-    for enrolment in db.query(EnrolmentModel).all():
-        for _ in range(10):
-            attendance_date = faker.date_between(start_date=enrolment.start_date, end_date=enrolment.end_date or date.today())
-            student = db.query(StudentModel).filter(StudentModel.id == enrolment.student_id).first()
-            if student.socio_economic_status == "Low":
-                present = random.random() < 0.2  # Lower attendance rate
-            elif student.socio_economic_status == "Medium":
-                present = random.random() < 0.1  # Lower attendance rate
-            else:
-                present = random.choice([True, False])
-            attendance = AttendanceModel(student_id=enrolment.student_id, class_id=random.choice(class_objects).id, present=present, attendance_date=attendance_date)
-            db.add(attendance)
+    # Secondary indexes are rebuilt once after loading, which is much cheaper than maintaining them per row
+    connection = db.connection()
+    indexes = [index for model, _ in SHARD_TABLES for index in model.__table__.indexes]
+    for index in indexes:
+        index.drop(connection, checkfirst=True)
+    # Likewise the rollups are rebuilt in one pass rather than by their per-row triggers
+    drop_rollup_triggers(connection)
+
+    # Shards are written in order by this single writer, so autoincrement ids are reproducible too
+    for rows in map_shards(shards, workers):
+        for model, columns in SHARD_TABLES:
+            insert_batches(db, model, columns, rows[model.__tablename__])
+
+    for index in indexes:
+        index.create(connection)
+    rebuild_rollups(connection)
+
+    # Record how the data was generated so a restart can tell whether it is reusable
+    db.merge(DatasetInfo(key="schema_version", value=SCHEMA_VERSION))
+    for key, value in [("students", scale.students), ("attendances_per_enrolment", scale.attendances_per_enrolment),
+                       ("incidents", scale.incidents), ("seed", seed)]:
+        db.merge(DatasetInfo(key=key, value=str(value)))
     db.commit()
 
-    # Add Incidents
-    for _ in range(50):
-        incident_date = faker.date_between(start_date='-6y', end_date='today')
-        student = random.choice(students)
-        if student.socio_economic_status == "Low":
-            incident_multiplier = 3 
-        elif student.socio_economic_status == "Medium":
-            incident_multiplier = 2
-        else:
-            incident_multiplier = 1
-        for _ in range(incident_multiplier):
-            incident = IncidentModel(incident_type=random.choice(["Poor Behaviour", "Injury"]), reported_datetime=incident_date, student_id=student.id)
-            db.add(incident)
-    db.commit() 
\ No newline at end of file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a mock school SQLite database")
+    parser.add_argument("--database", default="mock_school.db", help="SQLite file to (re)create")
+    parser.add_argument("--students", type=int, default=Scale.students)
+    parser.add_argument("--attendances-per-enrolment", type=int, default=Scale.attendances_per_enrolment)
+    parser.add_argument("--incidents", type=int, default=Scale.incidents)
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible output")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes generating shards in parallel")
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    with Session(engine) as db:
+        populate_data(db, Scale(args.students, args.attendances_per_enrolment, args.incidents), seed=args.seed, workers=args.workers)
+    print(f"Generated {args.students} students into {args.database} in {time.perf_counter() - started:.1f}s")
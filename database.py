@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+import config
+from instrumentation import instrument_engine
+from data_generation import Scale, populate_data
+from rollups import ensure_rollups
+from models import Base, SCHEMA_VERSION, DatasetInfo
+
+def engine_pragmas(profile: str) -> dict:
+    if profile == "default":
+        return {}
+    if profile == "tuned":
+        return {
+            # Readers no longer block behind writers, and commits append to the WAL instead of rewriting pages
+            "journal_mode": "WAL",
+            # Safe with WAL: only a power loss (not a crash) can drop the last commits
+            "synchronous": "NORMAL",
+            "mmap_size": config.DB_MMAP_SIZE,
+            "cache_size": -config.DB_CACHE_SIZE_KIB,
+            "temp_store": "MEMORY",
+            # Wait for a competing writer instead of failing with "database is locked"
+            "busy_timeout": config.DB_BUSY_TIMEOUT_MS,
+        }
+    raise ValueError(f"Unknown database profile '{profile}'")
+
+
+def build_engine(url: str, profile: str = "default"):
+    """Create a SQLite engine whose connections get the pragmas of ``profile``"""
+    pragmas = engine_pragmas(profile)
+    engine = create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        # Sessions are created and used on different threadpool threads
+        connect_args={"check_same_thread": False},
+    )
+
+    event.listen(engine, "connect", pragma_listener(pragmas))
+    instrument_engine(engine)
+    return engine
+
+
+def pragma_listener(pragmas: dict):
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    return set_sqlite_pragmas
+
+
+def build_async_engine(url: str, profile: str = "default"):
+    """Create an aiosqlite AsyncEngine on the same file, with the same pragmas"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+        # Waiting for a connection doesn't hold a thread here, so a fixed pool is
+        # safe, and it caps the number of aiosqlite connection threads
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=60,
+    )
+    event.listen(async_engine.sync_engine, "connect", pragma_listener(engine_pragmas(profile)))
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+# Create a SQLite database
+engine = build_engine(config.DATABASE_URL, config.DB_PROFILE)
+SessionLocal = sessionmaker(bind=engine)
+
+# Dependency to get the session
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def requested_dataset() -> dict:
+    """The dataset settings explicitly configured through the environment"""
+    requested = {"students": config.STUDENTS, "attendances_per_enrolment": config.ATTENDANCES_PER_ENROLMENT,
+                 "incidents": config.INCIDENTS, "seed": config.SEED}
+    return {key: value for key, value in requested.items() if value is not None}
+
+
+def stored_dataset_info() -> dict:
+    if not inspect(engine).has_table(DatasetInfo.__tablename__):
+        return {}
+    with SessionLocal() as db:
+        return {info.key: info.value for info in db.query(DatasetInfo)}
+
+
+def is_reusable(info: dict, requested: dict) -> bool:
+    return info.get("schema_version") == SCHEMA_VERSION and all(
+        info.get(key) == str(value) for key, value in requested.items())
+
+
+def ensure_indexes(bind=engine):
+    """Create any index declared in models.py that an existing database is missing"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+@contextmanager
+def database_lock():
+    """Hold an exclusive lock on ``<database>.lock`` against other processes (uvicorn workers)
+
+    Not available on Windows (no fcntl), where it doesn't lock.
+    """
+    path = engine.url.database
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is None or not path or path == ":memory:":
+        yield
+        return
+    with open(f"{path}.lock", "w") as lock_file:
+        # Blocks until a process generating the data is done
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def init_database(regenerate: bool = False) -> bool:
+    """Make sure the database holds a generated dataset, returning True if it had to be generated
+
+    An existing database is reused when it was generated for the current
+    schema and matches any dataset settings given in the environment, so
+    restarts, reloads and extra workers start instantly. Indexes, rollup and
+    change log triggers don't change the schema version; missing ones are
+    added to a reused database. ``regenerate`` forces a fresh dataset.
+
+    The check and the generation run under ``database_lock``, so workers
+    starting together wait for the first one to generate the data and then
+    reuse it.
+    """
+    # Imported here as these modules need the engine defined above
+    from changes import current_epoch, install_change_triggers, start_change_log_epoch
+    from snapshots import save_snapshot
+
+    requested = requested_dataset()
+    with database_lock():
+        if not regenerate and is_reusable(stored_dataset_info(), requested):
+            # Databases generated before an index was added get it here
+            ensure_indexes()
+            with engine.begin() as connection:
+                ensure_rollups(connection)
+            install_change_triggers(engine)
+            with SessionLocal() as db:
+                if current_epoch(db) is None:
+                    start_change_log_epoch(engine)
+            return False
+
+        # Drop all tables and recreate them
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        scale = Scale(**{key: value for key, value in requested.items() if key != "seed"})
+        with SessionLocal() as db:
+            populate_data(db, scale, seed=requested.get("seed"), workers=config.WORKERS)
+
+        install_change_triggers(engine)
+        start_change_log_epoch(engine)
+        save_snapshot()
+        return True
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+
+from models import Geography as GeographyModel, School as SchoolModel, Student as StudentModel, ScholasticYear as ScholasticYearModel, Class as ClassModel, Attendance as AttendanceModel, Enrolment as EnrolmentModel, Incident as IncidentModel, ClassEnrolment as ClassEnrolmentModel
+from schemas import Geography, GeographyCreate, School, SchoolCreate, Student, StudentCreate, ScholasticYear, ScholasticYearCreate, Class, ClassCreate, Attendance, AttendanceCreate, Enrolment, EnrolmentCreate, Incident, IncidentCreate, ClassEnrolment, ClassEnrolmentCreate
+
+
+@dataclass(frozen=True)
+class Entity:
+    """An API resource: its URL segment, ORM model and Pydantic schemas
+
+    ``expandable`` names the relationships that can be embedded with ``expand=``
+    and ``filters`` the columns list endpoints can be filtered on (indexed,
+    apart from those of the small reference tables).
+    """
+    path: str
+    model: type
+    schema: type
+    create_schema: type
+    expandable: tuple = ()
+    filters: tuple = ()
+
+    @property
+    def label(self) -> str:
+        return self.model.__name__
+
+    @property
+    def sortable(self) -> tuple:
+        return tuple(self.schema.model_fields) + tuple(name for name in self.filters if name not in self.schema.model_fields)
+
+
+ENTITIES = {
+    entity.path: entity
+    for entity in [
+        Entity("geographies", GeographyModel, Geography, GeographyCreate,
+               expandable=("schools",), filters=("city", "region")),
+        Entity("schools", SchoolModel, School, SchoolCreate,
+               expandable=("geography",), filters=("geography_id",)),
+        Entity("students", StudentModel, Student, StudentCreate,
+               expandable=("enrolments", "incidents"), filters=("socio_economic_status",)),
+        Entity("scholastic_years", ScholasticYearModel, ScholasticYear, ScholasticYearCreate,
+               expandable=("classes",), filters=("year",)),
+        Entity("classes", ClassModel, Class, ClassCreate,
+               expandable=("scholastic_year", "students"), filters=("scholastic_year_id",)),
+        Entity("attendances", AttendanceModel, Attendance, AttendanceCreate,
+               expandable=("student", "class"), filters=("student_id", "class_id", "present", "attendance_date")),
+        Entity("enrolments", EnrolmentModel, Enrolment, EnrolmentCreate,
+               expandable=("student", "school", "class_enrolments"), filters=("student_id", "school_id", "start_date")),
+        Entity("incidents", IncidentModel, Incident, IncidentCreate,
+               expandable=("student",), filters=("student_id", "incident_type", "reported_datetime")),
+        Entity("class_enrolments", ClassEnrolmentModel, ClassEnrolment, ClassEnrolmentCreate,
+               expandable=("enrolment", "class"), filters=("enrolment_id", "class_id")),
+    ]
+}
+
+ENTITIES_BY_MODEL = {entity.model: entity for entity in ENTITIES.values()}
+
+
+def get_entity(path: str) -> Entity:
+    entity = ENTITIES.get(path)
+    if entity is None:
+        raise HTTPException(status_code=404, detail=f"Unknown entity '{path}'")
+    return entity
@@ -0,0 +1,57 @@
+import keyword
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import joinedload, selectinload
+
+from entities import ENTITIES_BY_MODEL, Entity
+from instrumentation import timed_serialization
+
+EXPAND_DESCRIPTION = "Comma separated related rows to embed, e.g. geography or scholastic_year,students"
+
+
+def parse_expand(entity: Entity, expand: Optional[str]) -> Optional[tuple]:
+    """Return the relationships requested with ``expand=``, or None"""
+    if not expand:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in expand.split(",") if name.strip()))
+    unknown = [name for name in names if name not in entity.expandable]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot expand: {', '.join(unknown)}")
+    return names or None
+
+
+def relationship_attribute(entity: Entity, name: str):
+    # Relationships named after keywords (class) get a trailing underscore on the model
+    return getattr(entity.model, f"{name}_" if keyword.iskeyword(name) else name)
+
+
+def expand_options(entity: Entity, names: tuple) -> list:
+    """Loader options fetching the relationships in a fixed number of queries
+
+    Many-to-one rows are joined into the page query, collections are loaded
+    with one extra ``IN`` query each.
+    """
+    options = []
+    for name in names:
+        attribute = relationship_attribute(entity, name)
+        options.append(selectinload(attribute) if attribute.property.uselist else joinedload(attribute))
+    return options
+
+
+@timed_serialization
+def dump_expanded(entity: Entity, names: tuple, items) -> list:
+    """Serialize ORM rows to JSON-ready dicts with the related rows embedded under their names"""
+    dumped = []
+    for item in items:
+        data = entity.schema.model_validate(item).model_dump(mode="json")
+        for name in names:
+            attribute = relationship_attribute(entity, name)
+            related_schema = ENTITIES_BY_MODEL[attribute.property.mapper.class_].schema
+            related = getattr(item, attribute.key)
+            if attribute.property.uselist:
+                data[name] = [related_schema.model_validate(row).model_dump(mode="json") for row in related]
+            else:
+                data[name] = related_schema.model_validate(related).model_dump(mode="json") if related is not None else None
+        dumped.append(data)
+    return dumped
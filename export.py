@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select
+from starlette.background import BackgroundTask
+
+from columnar import build_columnar_query, connect_duckdb
+from database import SessionLocal
+from entities import Entity, get_entity
+from pagination import get_sort_column
+
+# Rows fetched per round trip from the server-side cursor, and rows per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+
+router = APIRouter()
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def build_export_statement(entity: Entity, sort: Optional[str], order: Optional[str], updated_after: Optional[datetime]):
+    model = entity.model
+    statement = select(model)
+    if updated_after:
+        statement = statement.where(model.updated_at > updated_after)
+    sort_column = get_sort_column(model, sort)
+    if order == "desc":
+        statement = statement.order_by(sort_column.desc(), model.id.desc())
+    else:
+        statement = statement.order_by(sort_column, model.id)
+    return statement
+
+
+def iter_export_rows(entity: Entity, statement):
+    """Yield batches of rows dumped through the entity's read schema
+
+    The generator owns its session so it stays open for the whole response,
+    and ``yield_per`` keeps only one batch of ORM objects alive at a time.
+    """
+    db = SessionLocal()
+    try:
+        result = db.scalars(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield [entity.schema.model_validate(item).model_dump(mode="json") for item in partition]
+    finally:
+        db.close()
+
+
+def iter_ndjson(entity: Entity, statement):
+    for rows in iter_export_rows(entity, statement):
+        yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def iter_csv(entity: Entity, statement):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(entity.schema.model_fields))
+    writer.writeheader()
+    for rows in iter_export_rows(entity, statement):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_arrow_stream(con, sql: str, params: list):
+    import pyarrow as pa
+
+    try:
+        reader = con.execute(sql, params).fetch_record_batch(EXPORT_BATCH_SIZE)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+        # Flush the end-of-stream marker written on close
+        yield sink.getvalue()
+    finally:
+        con.close()
+
+
+# The columnar routes are registered before /export/{entity}, which would otherwise match "students.parquet"
+@router.get("/export/{entity}.parquet")
+def export_entity_parquet(
+    entity: str,
+    sort: Optional[str] = Query(None, description="Field to sort by"),
+    order: Optional[str] = Query(None, description="Sort order (asc or desc)"),
+    updated_after: Optional[datetime] = Query(None, description="Filter items updated after this datetime (format: YYYY-MM-DDTHH:MM:SSZ)"),
+):
+    """Export an entity as a Parquet file written by DuckDB straight from the SQLite file"""
+    entity = get_entity(entity)
+    sql, params = build_columnar_query(entity, sort, order, updated_after)
+    con = connect_duckdb()
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        con.execute(f"COPY ({sql}) TO '{path}' (FORMAT PARQUET)", params)
+    except Exception:
+        os.remove(path)
+        raise
+    finally:
+        con.close()
+    return FileResponse(path, media_type="application/vnd.apache.parquet", filename=f"{entity.path}.parquet",
+                        background=BackgroundTask(os.remove, path))
+
+
+@router.get("/export/{entity}.arrow")
+def export_entity_arrow(
+    entity: str,
+    sort: Optional[str] = Query(None, description="Field to sort by"),
+    order: Optional[str] = Query(None, description="Sort order (asc or desc)"),
+    updated_after: Optional[datetime] = Query(None, description="Filter items updated after this datetime (format: YYYY-MM-DDTHH:MM:SSZ)"),
+):
+    """Stream an entity as Arrow IPC record batches (requires the optional pyarrow dependency)"""
+    entity = get_entity(entity)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Arrow export requires pyarrow, install it with `uv sync --extra arrow`")
+    sql, params = build_columnar_query(entity, sort, order, updated_after)
+    headers = {"Content-Disposition": f'attachment; filename="{entity.path}.arrow"'}
+    # Connected before the response starts, so a DuckDB failure is still an error status
+    con = connect_duckdb()
+    return StreamingResponse(iter_arrow_stream(con, sql, params), media_type="application/vnd.apache.arrow.stream", headers=headers)
+
+
+@router.get("/export/{entity}")
+def export_entity(
+    entity: str,
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Output format (ndjson or csv)"),
+    sort: Optional[str] = Query(None, description="Field to sort by"),
+    order: Optional[str] = Query(None, description="Sort order (asc or desc)"),
+    updated_after: Optional[datetime] = Query(None, description="Filter items updated after this datetime (format: YYYY-MM-DDTHH:MM:SSZ)"),
+):
+    """Stream every row of an entity in one response instead of paging through the list endpoint"""
+    entity = get_entity(entity)
+    statement = build_export_statement(entity, sort, order, updated_after)
+    if format == ExportFormat.csv:
+        content, media_type = iter_csv(entity, statement), "text/csv"
+    else:
+        content, media_type = iter_ndjson(entity, statement), "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{entity.path}.{format.value}"'}
+    return StreamingResponse(content, media_type=media_type, headers=headers)
@@ -0,0 +1,86 @@
+import inspect
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import Query
+
+from entities import Entity
+
+
+def get_example_datetimes():
+    now = datetime.now(timezone.utc)
+    one_day_ago = (now - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    one_week_ago = (now - timedelta(days=7)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return one_day_ago, one_week_ago
+
+
+def updated_after_query():
+    one_day_ago, one_week_ago = get_example_datetimes()
+    return Query(
+        None,
+        description="Filter items updated after this datetime (format: YYYY-MM-DDTHH:MM:SSZ)",
+        openapi_examples={
+            "one_day_ago": {
+                "summary": "One day ago",
+                "description": "Filter items updated after one day ago",
+                "value": one_day_ago
+            },
+            "one_week_ago": {
+                "summary": "One week ago",
+                "description": "Filter items updated after one week ago",
+                "value": one_week_ago
+            }
+        }
+    )
+
+
+@lru_cache(maxsize=None)
+def entity_filters(entity: Entity) -> dict:
+    """Map each query parameter allowed on ``entity`` to ``(annotation, description, build clause)``
+
+    Only the columns allowlisted in ``Entity.filters`` (all indexed) can be
+    filtered on. Date columns also get inclusive ``_from``/``_to`` bounds.
+    """
+    model = entity.model
+    filters = {
+        "ids": (Optional[List[int]], "Only rows with these ids (repeat the parameter for several)",
+                lambda value: model.id.in_(value)),
+        "updated_after": (Optional[datetime], None, lambda value: model.updated_at > value),
+    }
+    for name in entity.filters:
+        column = getattr(model, name)
+        python_type = column.type.python_type
+        filters[name] = (Optional[python_type], f"Only rows whose {name} equals this value",
+                         lambda value, column=column: column == value)
+        if python_type in (date, datetime):
+            filters[f"{name}_from"] = (Optional[python_type], f"Only rows whose {name} is on or after this value",
+                                       lambda value, column=column: column >= value)
+            filters[f"{name}_to"] = (Optional[python_type], f"Only rows whose {name} is on or before this value",
+                                     lambda value, column=column: column <= value)
+    return filters
+
+
+def filter_dependency(entity: Entity):
+    """Build a dependency collecting the entity's filters from the query string
+
+    FastAPI reads query parameters from the signature, so one is generated
+    per entity from ``entity_filters``.
+    """
+    parameters = [
+        inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation,
+                          default=updated_after_query() if name == "updated_after" else Query(None, description=description))
+        for name, (annotation, description, _) in entity_filters(entity).items()
+    ]
+
+    def filters(**values):
+        return {name: value for name, value in values.items() if value is not None}
+
+    filters.__signature__ = inspect.Signature(parameters)
+    return filters
+
+
+def filter_clauses(entity: Entity, filters: dict) -> list:
+    """Turn the values collected by ``filter_dependency`` into WHERE clauses"""
+    allowed = entity_filters(entity)
+    return [allowed[name][2](value) for name, value in filters.items()]
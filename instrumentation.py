@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import wraps
+from typing import Optional
+
+from fastapi import APIRouter, Response
+from sqlalchemy import event
+
+import config
+
+router = APIRouter()
+
+slow_query_logger = logging.getLogger("school.slow_queries")
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements worth an EXPLAIN QUERY PLAN in the slow-query log
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+    serializing: bool = False
+
+
+# Metrics of the request being handled; the threadpool copies the context, so sync routes see it too
+current_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("current_metrics", default=None)
+
+
+def explain(connection, statement: str, parameters) -> str:
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(f"  {row[-1]}" for row in cursor.fetchall())
+    except Exception as e:
+        return f"  (no plan: {e})"
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine):
+    """Time every statement run on ``engine``, adding it to the current request and logging the slow ones"""
+
+    # The start time lives on the statement's execution context, so a statement that
+    # fails (and never reaches after_cursor_execute) leaves nothing behind
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(connection, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(connection, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_seconds += elapsed
+        if config.SLOW_QUERY_MS is None or elapsed * 1000 < config.SLOW_QUERY_MS:
+            return
+        registry.slow_query()
+        plan = ""
+        if not executemany and statement.lstrip().lower().startswith(EXPLAINABLE):
+            plan = "\n" + explain(connection, statement, parameters)
+        slow_query_logger.warning("Slow query (%.1fms): %s %s%s", elapsed * 1000, statement, parameters, plan)
+
+
+def timed_serialization(function):
+    """Add the time spent in ``function`` to the current request's serialization time
+
+    Queries run meanwhile (lazy loads) are left out, they already count as DB time.
+    """
+    @wraps(function)
+    def timed(*args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return function(*args, **kwargs)
+        metrics.serializing = True
+        started, db_seconds = time.perf_counter(), metrics.db_seconds
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.serializing = False
+            metrics.serialization_seconds += time.perf_counter() - started - (metrics.db_seconds - db_seconds)
+    return timed
+
+
+class MetricsRegistry:
+    """Per route totals of requests, DB queries and time, kept in-process for /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._routes = {}
+        self._slow_queries = 0
+
+    def observe(self, method: str, route: str, status: int, duration: float, metrics: RequestMetrics):
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            totals = self._routes.get((method, route))
+            if totals is None:
+                totals = self._routes[(method, route)] = {
+                    "buckets": [0] * (len(DURATION_BUCKETS) + 1), "duration": 0.0,
+                    "queries": 0, "db": 0.0, "serialization": 0.0}
+            totals["buckets"][bisect_left(DURATION_BUCKETS, duration)] += 1
+            totals["duration"] += duration
+            totals["queries"] += metrics.queries
+            totals["db"] += metrics.db_seconds
+            totals["serialization"] += metrics.serialization_seconds
+
+    def slow_query(self):
+        with self._lock:
+            self._slow_queries += 1
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            routes = sorted((key, dict(totals, buckets=list(totals["buckets"]))) for key, totals in self._routes.items())
+            slow_queries = self._slow_queries
+
+        lines = ["# HELP school_api_requests_total HTTP requests handled.", "# TYPE school_api_requests_total counter"]
+        for (method, route, status), count in requests:
+            lines.append(f'school_api_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines += ["# HELP school_api_request_duration_seconds Time until the response headers were sent.",
+                  "# TYPE school_api_request_duration_seconds histogram"]
+        for (method, route), totals in routes:
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ("+Inf",), totals["buckets"]):
+                cumulative += count
+                lines.append(f'school_api_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"school_api_request_duration_seconds_sum{{{labels}}} {totals['duration']}")
+            lines.append(f"school_api_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        for name, key, description in (("db_queries_total", "queries", "Database statements executed."),
+                                       ("db_seconds_total", "db", "Time spent executing database statements."),
+                                       ("serialization_seconds_total", "serialization", "Time spent serializing responses.")):
+            lines += [f"# HELP school_api_{name} {description}", f"# TYPE school_api_{name} counter"]
+            for (method, route), totals in routes:
+                lines.append(f'school_api_{name}{{method="{method}",route="{route}"}} {totals[key]}')
+
+        lines += ["# HELP school_api_slow_queries_total Statements slower than SCHOOL_SLOW_QUERY_MS.",
+                  "# TYPE school_api_slow_queries_total counter", f"school_api_slow_queries_total {slow_queries}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def route_template(scope) -> str:
+    """The path template of the route that handled the request, e.g. /students/{item_id}"""
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class InstrumentationMiddleware:
+    """Count the queries, DB time and serialization time of each request
+
+    They are sent back in a Server-Timing header and added to the totals
+    served by /metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        duration, status = None, 500
+
+        async def send_with_timing(message):
+            nonlocal duration, status
+            if message["type"] == "http.response.start":
+                duration, status = time.perf_counter() - started, message["status"]
+                timing = (f'db;dur={metrics.db_seconds * 1000:.2f};desc="{metrics.queries} queries", '
+                          f"serialize;dur={metrics.serialization_seconds * 1000:.2f}, total;dur={duration * 1000:.2f}")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_metrics.reset(token)
+            registry.observe(scope["method"], route_template(scope), status,
+                             duration if duration is not None else time.perf_counter() - started, metrics)
+
+
+@router.get("/metrics")
+def read_metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
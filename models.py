@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, ForeignKey, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker, declared_attr
 from sqlalchemy.ext.hybrid import hybrid_property
+import hashlib
 from datetime import datetime, timezone
 
 Base = declarative_base()
@@ -10,6 +11,11 @@ class TimestampMixin:
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
 
+    @declared_attr
+    def __table_args__(cls):
+        # Incremental sync filters on updated_at and pages on (updated_at, id)
+        return (Index(f"ix_{cls.__tablename__}_updated_at_id", "updated_at", "id"),)
+
     @hybrid_property
     def is_recently_updated(self):
         now = datetime.now(timezone.utc)
@@ -25,12 +31,14 @@ class Geography(TimestampMixin, Base):
     id = Column(Integer, primary_key=True)
     city = Column(String)
     region = Column(String)
+    # Collections are read-only, they only exist to be embedded with expand=
+    schools = relationship('School', viewonly=True)
 
 class School(TimestampMixin, Base):
     __tablename__ = 'schools'
     id = Column(Integer, primary_key=True)
     name = Column(String)
-    geography_id = Column(Integer, ForeignKey('geography.id'))
+    geography_id = Column(Integer, ForeignKey('geography.id'), index=True)
     geography = relationship('Geography')
 
 class Student(TimestampMixin, Base):
@@ -38,47 +46,107 @@ class Student(TimestampMixin, Base):
     id = Column(Integer, primary_key=True)
     first_name = Column(String)
     last_name = Column(String)
-    socio_economic_status = Column(String)  # New column
+    socio_economic_status = Column(String, index=True)  # New column
+    enrolments = relationship('Enrolment', viewonly=True)
+    incidents = relationship('Incident', viewonly=True)
 
 class ScholasticYear(TimestampMixin, Base):
     __tablename__ = 'scholastic_year'
     id = Column(Integer, primary_key=True)
     year = Column(String)
+    classes = relationship('Class', viewonly=True)
 
 class Class(TimestampMixin, Base):
     __tablename__ = 'classes'
     id = Column(Integer, primary_key=True)
     subject = Column(String)  # New column
     name = Column(String)
-    scholastic_year_id = Column(Integer, ForeignKey('scholastic_year.id'))
+    scholastic_year_id = Column(Integer, ForeignKey('scholastic_year.id'), index=True)
     scholastic_year = relationship('ScholasticYear')
 
 class Attendance(TimestampMixin, Base):
     __tablename__ = 'attendances'
     id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey('students.id'))
-    class_id = Column(Integer, ForeignKey('classes.id'))
+    student_id = Column(Integer, ForeignKey('students.id'), index=True)
+    class_id = Column(Integer, ForeignKey('classes.id'), index=True)
     present = Column(Boolean)
-    attendance_date = Column(Date)
+    attendance_date = Column(Date, index=True)
+    student = relationship('Student')
+    class_ = relationship('Class')
 
 class Enrolment(TimestampMixin, Base):
     __tablename__ = 'enrolments'
     id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey('students.id'))
-    school_id = Column(Integer, ForeignKey('schools.id'))
-    start_date = Column(Date)
+    student_id = Column(Integer, ForeignKey('students.id'), index=True)
+    school_id = Column(Integer, ForeignKey('schools.id'), index=True)
+    start_date = Column(Date, index=True)
     end_date = Column(Date, nullable=True)
+    student = relationship('Student')
+    school = relationship('School')
+    class_enrolments = relationship('ClassEnrolment', viewonly=True)
 
 class Incident(TimestampMixin, Base):
     __tablename__ = 'incidents'
     id = Column(Integer, primary_key=True)
-    incident_type = Column(String)
-    reported_datetime = Column(Date)
-    student_id = Column(Integer, ForeignKey('students.id'))
+    incident_type = Column(String, index=True)
+    reported_datetime = Column(Date, index=True)
+    student_id = Column(Integer, ForeignKey('students.id'), index=True)
+    student = relationship('Student')
 
 class ClassEnrolment(TimestampMixin, Base):
     __tablename__ = 'class_enrolments'
     id = Column(Integer, primary_key=True)
-    enrolment_id = Column(Integer, ForeignKey('enrolments.id'))
-    class_id = Column(Integer, ForeignKey('classes.id'))
+    enrolment_id = Column(Integer, ForeignKey('enrolments.id'), index=True)
+    class_id = Column(Integer, ForeignKey('classes.id'), index=True)
     calendar_year = Column(Integer)
+    enrolment = relationship('Enrolment')
+    class_ = relationship('Class')
+
+# Students reach their classes through enrolments and class_enrolments
+Class.students = relationship(
+    Student,
+    secondary=ClassEnrolment.__table__.join(Enrolment.__table__, ClassEnrolment.enrolment_id == Enrolment.id),
+    primaryjoin=Class.id == ClassEnrolment.class_id,
+    secondaryjoin=Enrolment.student_id == Student.id,
+    viewonly=True,
+)
+
+class AttendanceMonthlyRollup(Base):
+    """Attendances per student, class and month, maintained by the triggers in rollups.py"""
+    __tablename__ = 'attendance_monthly_rollup'
+    student_id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, primary_key=True)
+    month = Column(String, primary_key=True)  # YYYY-MM
+    attendances = Column(Integer, nullable=False)
+    present = Column(Integer, nullable=False)
+
+class SchoolDailyRollup(Base):
+    """Attendances and incidents per school and day, maintained by the triggers in rollups.py"""
+    __tablename__ = 'school_daily_rollup'
+    school_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    attendances = Column(Integer, nullable=False)
+    present = Column(Integer, nullable=False)
+    incidents = Column(Integer, nullable=False)
+
+class ChangeLog(Base):
+    """Every insert, update and delete of the entity tables, written by the triggers in changes.py"""
+    __tablename__ = 'change_log'
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    operation = Column(String, nullable=False)  # insert, update or delete
+    changed_at = Column(String, nullable=False)
+    data = Column(String)  # JSON image of the row, NULL for deletes
+
+class DatasetInfo(Base):
+    """Key/value facts about the generated dataset, used to decide whether it can be reused"""
+    __tablename__ = 'dataset_info'
+    key = Column(String, primary_key=True)
+    value = Column(String)
+
+# Changes whenever a table or column is added, removed or retyped above
+SCHEMA_VERSION = hashlib.sha256("\n".join(sorted(
+    f"{table.name}.{column.name}:{column.type}" for table in Base.metadata.sorted_tables for column in table.columns
+)).encode()).hexdigest()[:16]
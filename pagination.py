@@ -0,0 +1,116 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy import and_, or_, tuple_
+
+from entities import ENTITIES_BY_MODEL
+
+
+def get_sort_column(model, sort: Optional[str]):
+    """Return the column to sort by, the primary key by default
+
+    Only the entity's ``sortable`` fields are accepted.
+    """
+    if not sort:
+        return model.id
+    if sort not in ENTITIES_BY_MODEL[model].sortable:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort}'")
+    return getattr(model, sort)
+
+
+def encode_cursor(sort_column, order: Optional[str], item) -> str:
+    """Build an opaque cursor pointing just after ``item`` for the given sort"""
+    value = getattr(item, sort_column.key)
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = [sort_column.key, order or "asc", value, item.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(sort_column, order: Optional[str], cursor: str):
+    """Return the ``(sort value, id)`` stored in ``cursor``, validating it matches the sort"""
+    try:
+        key, cursor_order, value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if key != sort_column.key or cursor_order != (order or "asc"):
+            raise ValueError("cursor was issued for a different sort")
+        if value is not None:
+            python_type = sort_column.type.python_type
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            else:
+                value = python_type(value)
+        return value, int(last_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def seek_after(sort_column, id_column, value, last_id: int, descending: bool):
+    """Keyset predicate selecting the rows that follow ``(value, last_id)``
+
+    SQLite sorts NULLs first, so they are handled explicitly around the
+    row-value comparison (which is what lets SQLite seek on the index).
+    """
+    if sort_column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+    if descending:
+        if value is None:
+            return and_(sort_column.is_(None), id_column < last_id)
+        return or_(tuple_(sort_column, id_column) < tuple_(value, last_id), sort_column.is_(None))
+    if value is None:
+        return or_(and_(sort_column.is_(None), id_column > last_id), sort_column.isnot(None))
+    return tuple_(sort_column, id_column) > tuple_(value, last_id)
+
+
+def page_query(query, model, *, limit: int, offset: Optional[int], page: Optional[int],
+               cursor: Optional[str], sort: Optional[str], order: Optional[str]):
+    """Sort and limit ``query`` (a Query or a select()) to one page, plus one row to detect a next page
+
+    Offset paging is used when ``offset`` or ``page`` is given. Otherwise the
+    page is fetched by keyset on ``(sort column, id)``, so deep pages cost the
+    same as the first one.
+    """
+    sort_column = get_sort_column(model, sort)
+    descending = order == "desc"
+    if sort_column is model.id:
+        query = query.order_by(model.id.desc() if descending else model.id)
+    elif descending:
+        query = query.order_by(sort_column.desc(), model.id.desc())
+    else:
+        query = query.order_by(sort_column, model.id)
+
+    if offset is not None or page is not None:
+        current_offset = offset if offset is not None else (page - 1) * limit
+        return query.offset(current_offset).limit(limit + 1)
+    if cursor:
+        value, last_id = decode_cursor(sort_column, order, cursor)
+        query = query.filter(seek_after(sort_column, model.id, value, last_id, descending))
+    return query.limit(limit + 1)
+
+
+def page_result(request: Request, rows, model, *, limit: int, offset: Optional[int], page: Optional[int],
+                sort: Optional[str], order: Optional[str]):
+    """Split the rows fetched by ``page_query`` into ``(items, next_url)``
+
+    In offset mode the ``next`` link carries the next offset, otherwise an
+    opaque cursor pointing after the last item.
+    """
+    items = rows[:limit]
+    if len(rows) <= limit or not items:
+        return items, None
+    if offset is not None or page is not None:
+        current_offset = offset if offset is not None else (page - 1) * limit
+        return items, str(request.url.remove_query_params(["page", "cursor"]).include_query_params(
+            limit=limit, offset=current_offset + limit))
+    return items, str(request.url.include_query_params(
+        limit=limit, cursor=encode_cursor(get_sort_column(model, sort), order, items[-1])))
+
+
+def paginate(request: Request, query, model, *, limit: int, offset: Optional[int], page: Optional[int],
+             cursor: Optional[str], sort: Optional[str], order: Optional[str]):
+    """Sort and page ``query``, returning ``(items, next_url)``"""
+    rows = page_query(query, model, limit=limit, offset=offset, page=page, cursor=cursor, sort=sort, order=order).all()
+    return page_result(request, rows, model, limit=limit, offset=offset, page=page, sort=sort, order=order)
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from fastapi import HTTPException
+
+from entities import Entity
+from pagination import get_sort_column
+
+FIELDS_DESCRIPTION = "Comma separated fields to return (e.g. id,updated_at), only these columns are read"
+
+
+def all_fields(entity: Entity) -> tuple:
+    return tuple(entity.schema.model_fields)
+
+
+def parse_fields(entity: Entity, fields: Optional[str]) -> Optional[tuple]:
+    """Return the field names requested with ``fields=``, or None to return whole rows"""
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in entity.schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names or None
+
+
+def projected_columns(entity: Entity, names: tuple, sort: Optional[str] = None) -> list:
+    """Columns to select for ``names``, plus id and the sort column which the cursor is built from"""
+    sort_column = get_sort_column(entity.model, sort)
+    keys = dict.fromkeys(("id", sort_column.key) + names)
+    return [getattr(entity.model, key) for key in keys]
@@ -0,0 +1,138 @@
+"""Summary tables kept up to date by SQLite triggers
+
+``attendance_monthly_rollup`` counts attendances per (student, class, month)
+and ``school_daily_rollup`` attendances and incidents per (school, day), so
+dashboards read one row per group instead of scanning the fact tables.
+
+Triggers apply each insert, update and delete as a delta in the same
+transaction, whichever route (single row, bulk, bulk by filter) wrote it.
+Bulk loads drop them and rebuild the tables in one pass instead.
+
+Attendances and incidents are credited to the school of the enrolment open
+on their day, so a change to enrolments moves the affected students' days
+between schools: their contributions are taken out before the change (while
+the old enrolments are still visible) and added back after it.
+"""
+from sqlalchemy import text
+
+
+def school_of(student_id: str, on_date: str) -> str:
+    # The school of the enrolment open on that day (attendances and incidents don't record one)
+    return f"""(SELECT e.school_id FROM enrolments e
+        WHERE e.student_id = {student_id} AND e.start_date <= {on_date}
+          AND (e.end_date IS NULL OR e.end_date >= {on_date})
+        ORDER BY e.start_date DESC LIMIT 1)"""
+
+
+def monthly_delta(row: str, sign: int) -> str:
+    return f"""
+    INSERT INTO attendance_monthly_rollup (student_id, class_id, month, attendances, present)
+    VALUES ({row}.student_id, {row}.class_id, strftime('%Y-%m', {row}.attendance_date), {sign}, {sign} * coalesce({row}.present, 0))
+    ON CONFLICT (student_id, class_id, month) DO UPDATE SET
+        attendances = attendances + excluded.attendances, present = present + excluded.present;
+    DELETE FROM attendance_monthly_rollup
+    WHERE student_id = {row}.student_id AND class_id = {row}.class_id
+      AND month = strftime('%Y-%m', {row}.attendance_date) AND attendances = 0;"""
+
+
+def daily_delta(row: str, on_date: str, attendances: str, present: str, incidents: str) -> str:
+    # The WHERE is required by SQLite to tell ON CONFLICT apart from a join constraint
+    return f"""
+    INSERT INTO school_daily_rollup (school_id, day, attendances, present, incidents)
+    SELECT school_id, {row}.{on_date}, {attendances}, {present}, {incidents}
+    FROM (SELECT {school_of(f"{row}.student_id", f"{row}.{on_date}")} AS school_id) WHERE school_id IS NOT NULL
+    ON CONFLICT (school_id, day) DO UPDATE SET
+        attendances = attendances + excluded.attendances, present = present + excluded.present,
+        incidents = incidents + excluded.incidents;
+    DELETE FROM school_daily_rollup WHERE day = {row}.{on_date} AND attendances = 0 AND incidents = 0;"""
+
+
+def school_day_contributions(attendance_filter: str = "", incident_filter: str = "") -> str:
+    """One (school_id, day, attendances, present, incidents) row per attendance and incident, with a known school"""
+    return f"""SELECT * FROM (
+        SELECT {school_of("a.student_id", "a.attendance_date")} AS school_id, a.attendance_date AS day,
+               1 AS attendances, coalesce(a.present, 0) AS present, 0 AS incidents
+        FROM attendances a {attendance_filter}
+        UNION ALL
+        SELECT {school_of("i.student_id", "i.reported_datetime")}, i.reported_datetime, 0, 0, 1
+        FROM incidents i {incident_filter}
+    ) WHERE school_id IS NOT NULL"""
+
+
+def students_delta(student_ids: str, sign: int) -> str:
+    """Add (or take out, with ``sign`` -1) every attendance and incident of ``student_ids`` to the school rollup"""
+    contributions = school_day_contributions(f"WHERE a.student_id IN ({student_ids})", f"WHERE i.student_id IN ({student_ids})")
+    statement = f"""
+    INSERT INTO school_daily_rollup (school_id, day, attendances, present, incidents)
+    SELECT school_id, day, {sign} * sum(attendances), {sign} * sum(present), {sign} * sum(incidents)
+    FROM ({contributions}) WHERE true GROUP BY school_id, day
+    ON CONFLICT (school_id, day) DO UPDATE SET
+        attendances = attendances + excluded.attendances, present = present + excluded.present,
+        incidents = incidents + excluded.incidents;"""
+    if sign > 0:
+        # Days taken out before the change and not credited back to the same school
+        statement += f"""
+    DELETE FROM school_daily_rollup WHERE attendances = 0 AND incidents = 0 AND day IN (
+        SELECT attendance_date FROM attendances WHERE student_id IN ({student_ids})
+        UNION SELECT reported_datetime FROM incidents WHERE student_id IN ({student_ids}));"""
+    return statement
+
+
+def attendance_delta(row: str, sign: int) -> str:
+    return monthly_delta(row, sign) + daily_delta(row, "attendance_date", str(sign), f"{sign} * coalesce({row}.present, 0)", "0")
+
+
+def incident_delta(row: str, sign: int) -> str:
+    return daily_delta(row, "reported_datetime", "0", "0", str(sign))
+
+
+TRIGGERS = {
+    "attendances_rollup_insert": ("AFTER INSERT ON attendances", attendance_delta("NEW", 1)),
+    "attendances_rollup_update": ("AFTER UPDATE OF student_id, class_id, attendance_date, present ON attendances",
+                                  attendance_delta("OLD", -1) + attendance_delta("NEW", 1)),
+    "attendances_rollup_delete": ("AFTER DELETE ON attendances", attendance_delta("OLD", -1)),
+    "incidents_rollup_insert": ("AFTER INSERT ON incidents", incident_delta("NEW", 1)),
+    "incidents_rollup_update": ("AFTER UPDATE OF student_id, reported_datetime ON incidents",
+                                incident_delta("OLD", -1) + incident_delta("NEW", 1)),
+    "incidents_rollup_delete": ("AFTER DELETE ON incidents", incident_delta("OLD", -1)),
+    "enrolments_rollup_before_insert": ("BEFORE INSERT ON enrolments", students_delta("NEW.student_id", -1)),
+    "enrolments_rollup_insert": ("AFTER INSERT ON enrolments", students_delta("NEW.student_id", 1)),
+    "enrolments_rollup_before_update": ("BEFORE UPDATE OF student_id, school_id, start_date, end_date ON enrolments",
+                                        students_delta("OLD.student_id, NEW.student_id", -1)),
+    "enrolments_rollup_update": ("AFTER UPDATE OF student_id, school_id, start_date, end_date ON enrolments",
+                                 students_delta("OLD.student_id, NEW.student_id", 1)),
+    "enrolments_rollup_before_delete": ("BEFORE DELETE ON enrolments", students_delta("OLD.student_id", -1)),
+    "enrolments_rollup_delete": ("AFTER DELETE ON enrolments", students_delta("OLD.student_id", 1)),
+}
+
+REBUILD = [
+    "DELETE FROM attendance_monthly_rollup",
+    """INSERT INTO attendance_monthly_rollup (student_id, class_id, month, attendances, present)
+    SELECT student_id, class_id, strftime('%Y-%m', attendance_date), count(*), sum(coalesce(present, 0))
+    FROM attendances GROUP BY 1, 2, 3""",
+    "DELETE FROM school_daily_rollup",
+    f"""INSERT INTO school_daily_rollup (school_id, day, attendances, present, incidents)
+    SELECT school_id, day, sum(attendances), sum(present), sum(incidents)
+    FROM ({school_day_contributions()}) GROUP BY school_id, day""",
+]
+
+
+def drop_rollup_triggers(connection):
+    for name in TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def ensure_rollups(connection):
+    """Rebuild the rollups of a reused database missing any of the triggers (they may have drifted without it)"""
+    installed = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+    if not set(TRIGGERS) <= installed:
+        rebuild_rollups(connection)
+
+
+def rebuild_rollups(connection):
+    """Recompute the rollup tables from scratch and (re)install the triggers maintaining them"""
+    drop_rollup_triggers(connection)
+    for statement in REBUILD:
+        connection.execute(text(statement))
+    for name, (event, body) in TRIGGERS.items():
+        connection.execute(text(f"CREATE TRIGGER {name} {event} FOR EACH ROW BEGIN{body}\nEND"))
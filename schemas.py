@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from datetime import date, datetime
 from typing import Generic, List, Optional, TypeVar
 from pydantic.generics import GenericModel
@@ -141,11 +141,41 @@ class ClassEnrolment(ClassEnrolmentBase):
     class Config:
         from_attributes = True
 
+class AttendanceMonthlyRollup(BaseModel):
+    student_id: int
+    class_id: int
+    month: str
+    attendances: int
+    present: int
+
+    @computed_field
+    @property
+    def attendance_rate(self) -> float:
+        return round(self.present / self.attendances, 4) if self.attendances else 0.0
+
+    class Config:
+        from_attributes = True
+
+class SchoolDailyRollup(BaseModel):
+    school_id: int
+    day: date
+    attendances: int
+    present: int
+    incidents: int
+
+    @computed_field
+    @property
+    def attendance_rate(self) -> Optional[float]:
+        return round(self.present / self.attendances, 4) if self.attendances else None
+
+    class Config:
+        from_attributes = True
+
 
 # Define a generic type variable 
 T = TypeVar('T') 
 
 class PaginatedResponse(GenericModel, Generic[T]): 
     items: List[T] 
-    total: int 
+    total: Optional[int] = None
     next: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,72 @@
+import operator
+import typing
+from datetime import date, datetime
+from functools import lru_cache
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Date
+
+from entities import Entity
+from instrumentation import timed_serialization
+
+
+def field_converter(annotation, column):
+    """Return the function turning a value read from ``column`` into what the schema field would hold, if needed"""
+    annotations = typing.get_args(annotation) or (annotation,)
+    # Incident.reported_datetime is stored as a date but declared as a datetime, which pydantic widens to midnight
+    if datetime in annotations and isinstance(column.type, Date):
+        return lambda value: datetime(value.year, value.month, value.day) if isinstance(value, date) else value
+    return None
+
+
+@lru_cache(maxsize=None)
+def row_serializer(entity: Entity, names: tuple, columns: tuple):
+    """Build a function turning Row tuples selected as ``columns`` into dicts of ``names`` that orjson can encode as is
+
+    The values come straight from the columns, so unlike building the schema
+    per row there is no validation pass; only fields whose column type differs
+    from the schema are converted.
+    """
+    if names == columns:
+        def serialize(rows):
+            return [dict(zip(names, row)) for row in rows]
+    else:
+        # The selected columns also hold id and the sort column, needed for the cursor
+        getter = operator.itemgetter(*(columns.index(name) for name in names))
+        if len(names) == 1:
+            def serialize(rows):
+                return [{names[0]: getter(row)} for row in rows]
+        else:
+            def serialize(rows):
+                return [dict(zip(names, getter(row))) for row in rows]
+
+    converters = []
+    for name in names:
+        converter = field_converter(entity.schema.model_fields[name].annotation, entity.model.__table__.columns[name])
+        if converter is not None:
+            converters.append((name, converter))
+    if not converters:
+        return serialize
+
+    def serialize_converted(rows):
+        items = serialize(rows)
+        for item in items:
+            for name, converter in converters:
+                item[name] = converter(item[name])
+        return items
+    return serialize_converted
+
+
+@timed_serialization
+def dump_rows(entity: Entity, names: tuple, rows) -> list:
+    """Turn selected rows into dicts holding only ``names``"""
+    if not rows:
+        return []
+    return row_serializer(entity, names, tuple(rows[0]._fields))(rows)
+
+
+@timed_serialization
+def json_response(content) -> Response:
+    """Encode ``content`` with orjson into a raw response, skipping FastAPI's response_model pass"""
+    return Response(orjson.dumps(content), media_type="application/json")
@@ -0,0 +1,66 @@
+import os
+import re
+import sqlite3
+
+import config
+from changes import start_change_log_epoch
+from database import engine
+
+# Snapshot saved after every data generation and restored by a plain /reset/
+GOLDEN_SNAPSHOT = "golden"
+
+SNAPSHOT_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def snapshot_path(name: str) -> str:
+    if not SNAPSHOT_NAME.match(name):
+        raise ValueError("Snapshot names may only contain letters, digits, '-' and '_'")
+    return os.path.join(config.SNAPSHOT_DIR, f"{name}.db")
+
+
+def list_snapshots() -> list:
+    if not os.path.isdir(config.SNAPSHOT_DIR):
+        return []
+    return sorted(filename[:-3] for filename in os.listdir(config.SNAPSHOT_DIR) if filename.endswith(".db"))
+
+
+def save_snapshot(name: str = GOLDEN_SNAPSHOT):
+    """Copy the live database to a snapshot file with SQLite's online backup API
+
+    The copy is written next to the target and renamed into place, so a
+    snapshot is never left half written.
+    """
+    path = snapshot_path(name)
+    os.makedirs(config.SNAPSHOT_DIR, exist_ok=True)
+    partial_path = f"{path}.partial"
+    connection = engine.raw_connection()
+    try:
+        target = sqlite3.connect(partial_path)
+        try:
+            connection.driver_connection.backup(target)
+        finally:
+            target.close()
+        os.replace(partial_path, path)
+    finally:
+        connection.close()
+
+
+def restore_snapshot(name: str = GOLDEN_SNAPSHOT):
+    """Overwrite the live database with a snapshot
+
+    The backup API copies the pages within a single transaction on the live
+    database, so other connections see either the old or the restored data.
+    The change log gets a new epoch.
+    """
+    path = snapshot_path(name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    source = sqlite3.connect(path)
+    connection = engine.raw_connection()
+    try:
+        source.backup(connection.driver_connection)
+    finally:
+        connection.close()
+        source.close()
+    # The restored log reuses sequence numbers already handed out, so clients following it must notice
+    start_change_log_epoch(engine)
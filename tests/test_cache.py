@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+# config is read at import time, so the app gets a small throwaway dataset
+directory = tempfile.mkdtemp()
+os.environ.update(SCHOOL_DATABASE_URL=f"sqlite:///{os.path.join(directory, 'school.db')}",
+                  SCHOOL_SNAPSHOT_DIR=os.path.join(directory, "snapshots"), SCHOOL_STUDENTS="200", SCHOOL_SEED="0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+def test_expanded_students_invalidated_by_class_enrolment_writes():
+    with TestClient(main.app) as client:
+        first = client.get("/classes/1?expand=students")
+        assert first.headers["x-cache"] == "MISS"
+        students = first.json()["students"]
+        assert students
+
+        deleted = client.delete("/class_enrolments/bulk?class_id=1")
+        assert deleted.json() == {"deleted": len(students)}
+
+        again = client.get("/classes/1?expand=students")
+        assert again.headers["x-cache"] == "MISS"
+        assert again.json()["students"] == []